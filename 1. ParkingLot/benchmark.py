@@ -0,0 +1,242 @@
+# Benchmark -> reproducible load for ParkingLot with machine-readable results
+#
+# Builds a synthetic lot (levels x spots, vehicle type mix, plain or compact
+# levels), generates a seeded arrival/departure trace up front and replays it
+# in time order. Every admit_vehicle, release_vehicle and sampled
+# get_available_spots call is timed, then fee calculation is timed on the
+# closed tickets, both per ticket and as one batch; closed tickets carry the
+# simulated entry and exit times of the trace, so fees cover real stays. Results are JSON; --baseline compares against an
+# earlier run and exits non-zero on a regression.
+#
+#   python benchmark.py --levels 10 --spots 5000 --arrivals 200000 --output run.json
+#   python benchmark.py --profile --tracemalloc
+#   python benchmark.py --baseline run.json --tolerance 0.15
+import argparse
+import cProfile
+import heapq
+import io
+import json
+import platform
+import pstats
+import random
+import sys
+import time
+import tracemalloc
+
+from design import (VehicleType, Car, Truck, Bike, ParkingLot, ParkingLevel, CompactParkingLevel,
+                    SpotFactory, FlatRateFeeStrategy, VehicleBasedFeeStrategy)
+
+VEHICLE_CLASSES = {VehicleType.CAR: Car, VehicleType.TRUCK: Truck, VehicleType.BIKE: Bike}
+ARRIVE = 0
+DEPART = 1
+
+# 1. Synthetic lots and traces
+def build_lot(levels, spots_per_level, mix, compact=False):
+  pattern = [vehicle_type for vehicle_type, weight in zip(VehicleType, mix) for _ in range(weight)]
+  lot = ParkingLot()
+  for level_number in range(1, levels + 1):
+    types = [pattern[i % len(pattern)] for i in range(spots_per_level)]
+    if compact:
+      lot.add_level(CompactParkingLevel(level_number, types, f"L{level_number}-"))
+    else:
+      factory = SpotFactory(f"L{level_number}-")
+      lot.add_level(ParkingLevel(level_number, [factory.make_spot(t) for t in types]))
+  return lot
+
+def generate_trace(arrivals, rate_per_hour, mean_stay_hours, mix, seed):
+  # Poisson arrivals, log-normal stays; yields (time, event, vehicle index, vehicle)
+  rng = random.Random(seed)
+  types = list(VehicleType)
+  heap = []
+  now = 0.0
+  for index in range(arrivals):
+    now += rng.expovariate(rate_per_hour / 3600.0)
+    vehicle_type = rng.choices(types, weights=mix)[0]
+    stay = rng.lognormvariate(0.0, 0.75) * mean_stay_hours * 3600.0
+    heapq.heappush(heap, (now + stay, DEPART, index, None))
+    while heap and heap[0][0] <= now:
+      yield heapq.heappop(heap)
+    yield (now, ARRIVE, index, VEHICLE_CLASSES[vehicle_type](f"V{index}"))
+  while heap:
+    yield heapq.heappop(heap)
+
+# 2. Measurement
+def summarize(samples, elapsed=None):
+  samples.sort()
+  count = len(samples)
+  if not count:
+    return {"count": 0}
+  def pct(p):
+    return samples[min(count - 1, int(p / 100.0 * count))] * 1e6
+  total = sum(samples)
+  return {"count": count,
+          "ops_per_sec": count / (elapsed if elapsed else total),
+          "mean_us": total / count * 1e6,
+          "p50_us": pct(50), "p90_us": pct(90), "p99_us": pct(99), "max_us": samples[-1] * 1e6}
+
+def replay(lot, trace, query_every):
+  perf_counter = time.perf_counter
+  admit, release, query = [], [], []
+  tickets, closed = {}, []
+  rejected = 0
+  events = 0
+  types = list(VehicleType)
+  start = perf_counter()
+  for at, event, index, vehicle in trace:
+    events += 1
+    if event == ARRIVE:
+      t0 = perf_counter()
+      try:
+        ticket = lot.admit_vehicle(vehicle)
+      except Exception:
+        ticket = None
+      admit.append(perf_counter() - t0)
+      if ticket is None:
+        rejected += 1
+      else:
+        tickets[index] = (ticket, at)
+    else:
+      ticket, arrived_at = tickets.pop(index, (None, None))
+      if ticket is not None:
+        t0 = perf_counter()
+        lot.release_vehicle(ticket.ticket_id)
+        release.append(perf_counter() - t0)
+        # the ticket has left the store; give it the simulated stay for the fee timings
+        ticket.entry_timestamp, ticket.exit_timestamp = arrived_at, at
+        closed.append(ticket)
+    if query_every and events % query_every == 0:
+      level = lot.levels[events // query_every % len(lot.levels)]
+      t0 = perf_counter()
+      level.get_available_spots(types[events % len(types)])
+      query.append(perf_counter() - t0)
+  elapsed = perf_counter() - start
+  return {"elapsed_sec": elapsed, "events": events, "events_per_sec": events / elapsed,
+          "rejected": rejected, "admit_vehicle": summarize(admit), "release_vehicle": summarize(release),
+          "get_available_spots": summarize(query)}, closed
+
+def time_fees(closed):
+  results = {}
+  for strategy in (FlatRateFeeStrategy(), VehicleBasedFeeStrategy()):
+    name = type(strategy).__name__
+    perf_counter = time.perf_counter
+    samples = []
+    for ticket in closed:
+      t0 = perf_counter()
+      strategy.calculate_fee(ticket)
+      samples.append(perf_counter() - t0)
+    results[name] = summarize(samples)
+    t0 = perf_counter()
+    strategy.settle_tickets(closed)
+    elapsed = perf_counter() - t0
+    results[name + ".batch"] = {"count": len(closed), "elapsed_sec": elapsed,
+                                "ops_per_sec": len(closed) / elapsed if elapsed else 0.0}
+  return results
+
+def run(args):
+  mix = [int(weight) for weight in args.mix.split(":")]
+  t0 = time.perf_counter()
+  lot = build_lot(args.levels, args.spots, mix, args.compact)
+  build_sec = time.perf_counter() - t0
+  # generated before the replay so that only lot operations are on the clock
+  t0 = time.perf_counter()
+  trace = list(generate_trace(args.arrivals, args.rate, args.stay, mix, args.seed))
+  trace_sec = time.perf_counter() - t0
+
+  profiler = cProfile.Profile() if args.profile else None
+  if args.tracemalloc:
+    tracemalloc.start()
+  if profiler:
+    profiler.enable()
+  ops, closed = replay(lot, trace, args.query_every)
+  if profiler:
+    profiler.disable()
+  memory = None
+  if args.tracemalloc:
+    current, peak = tracemalloc.get_traced_memory()
+    top = tracemalloc.take_snapshot().statistics("lineno")[:10]
+    tracemalloc.stop()
+    memory = {"current_bytes": current, "peak_bytes": peak,
+              "top": [{"where": str(stat.traceback), "bytes": stat.size, "count": stat.count}
+                      for stat in top]}
+
+  result = {
+    "config": {"levels": args.levels, "spots_per_level": args.spots, "mix": mix,
+               "compact": args.compact, "arrivals": args.arrivals, "rate_per_hour": args.rate,
+               "mean_stay_hours": args.stay, "query_every": args.query_every, "seed": args.seed},
+    "environment": {"python": platform.python_version(), "implementation": platform.python_implementation(),
+                    "machine": platform.machine()},
+    "build_sec": build_sec,
+    "trace_sec": trace_sec,
+    "replay": ops,
+    "fees": time_fees(closed),
+  }
+  if memory:
+    result["tracemalloc"] = memory
+  if profiler:
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(args.profile_top)
+    if args.profile_output:
+      profiler.dump_stats(args.profile_output)
+    result["profile"] = stream.getvalue()
+  return result
+
+# 3. Regression check
+def compare(result, baseline, tolerance):
+  # flags any operation whose p50 or p99 grew by more than tolerance; runs of
+  # a different lot or trace are not comparable and raise ValueError
+  config, baseline_config = result["config"], baseline.get("config", {})
+  if config != baseline_config:
+    differences = sorted(key for key in set(config) | set(baseline_config)
+                         if config.get(key) != baseline_config.get(key))
+    raise ValueError(f"baseline config differs in {', '.join(differences)}; not comparing")
+  regressions = []
+  sections = [("replay", name) for name in ("admit_vehicle", "release_vehicle", "get_available_spots")]
+  sections += [("fees", name) for name in result["fees"] if not name.endswith(".batch")]
+  for section, name in sections:
+    new, old = result[section].get(name, {}), baseline.get(section, {}).get(name, {})
+    for metric in ("p50_us", "p99_us"):
+      if metric in new and old.get(metric):
+        change = new[metric] / old[metric] - 1.0
+        if change > tolerance:
+          regressions.append({"op": name, "metric": metric, "baseline": old[metric],
+                              "current": new[metric], "change": change})
+  return regressions
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="benchmark ParkingLot admission, release, queries and fees")
+  parser.add_argument("--levels", type=int, default=5)
+  parser.add_argument("--spots", type=int, default=2000, help="spots per level")
+  parser.add_argument("--mix", default="6:1:3", help="CAR:TRUCK:BIKE weights for spots and arrivals")
+  parser.add_argument("--compact", action="store_true", help="use CompactParkingLevel")
+  parser.add_argument("--arrivals", type=int, default=100000)
+  parser.add_argument("--rate", type=float, default=3000.0, help="arrivals per simulated hour")
+  parser.add_argument("--stay", type=float, default=2.0, help="mean stay in hours")
+  parser.add_argument("--query-every", type=int, default=50, help="time get_available_spots every N events")
+  parser.add_argument("--seed", type=int, default=42)
+  parser.add_argument("--profile", action="store_true", help="capture cProfile stats of the replay")
+  parser.add_argument("--profile-top", type=int, default=25)
+  parser.add_argument("--profile-output", help="also dump raw cProfile stats to this file")
+  parser.add_argument("--tracemalloc", action="store_true", help="capture peak memory of the replay")
+  parser.add_argument("--output", help="write JSON here instead of stdout")
+  parser.add_argument("--baseline", help="JSON from an earlier run to compare against")
+  parser.add_argument("--tolerance", type=float, default=0.10)
+  args = parser.parse_args()
+
+  result = run(args)
+  exit_code = 0
+  if args.baseline:
+    with open(args.baseline) as f:
+      baseline = json.load(f)
+    try:
+      result["regressions"] = compare(result, baseline, args.tolerance)
+    except ValueError as e:
+      print(f"benchmark.py: {e}", file=sys.stderr)
+      sys.exit(2)   # 1 is reserved for regressions
+    exit_code = 1 if result["regressions"] else 0
+  text = json.dumps(result, indent=2)
+  if args.output:
+    with open(args.output, "w") as f:
+      f.write(text + "\n")
+  else:
+    print(text)
+  sys.exit(exit_code)
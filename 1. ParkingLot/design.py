@@ -1,15 +1,29 @@
 # 1. Vehicle -> license_plate - Enum VehicleType{Car, Bus, Bike} - get_type(), fee_rate()
 import itertools
+from array import array
+from collections import deque
+from collections.abc import Sequence
+from contextlib import ExitStack, nullcontext
 from enum import Enum
-import uuid
 import time
-from abc import ABC
+from bisect import bisect_left
+import sys
+import random
+from abc import ABC, abstractmethod
+from threading import Lock, Thread
+
+try:
+  import numpy as np
+except ImportError:  # batch settlement falls back to a plain Python pass
+  np = None
 
 class VehicleType(Enum):
   CAR = 1
   TRUCK = 2
   BIKE = 3
 
+VEHICLE_TYPES = {vehicle_type.value: vehicle_type for vehicle_type in VehicleType}
+
 class Vehicle:
   def __init__(self, license_plate, vehicle_type):
     self.license_plate = license_plate
@@ -33,39 +47,177 @@ class ParkingSpot:
     self.spot_number = spot_number
     self.vehicle_type = vehicle_type
     self.vehicle = None
+    self.level = None       # set by ParkingLevel, keeps its free-spot pool in sync
+    self.index = -1         # position inside level.spots
+    self.pool_index = -1    # position inside the level's free pool, -1 when taken
 
   def is_available(self):
     return self.vehicle is None
   
   def park(self, vehicle):
+    if self.level is None:
+      return self._park(vehicle)
+    with self.level.locks[self.vehicle_type]:
+      if self._park(vehicle):
+        self.level.remove_free_spot(self)
+        if self.level.observers:
+          self.level.notify(PARK, self)
+        return True
+    return False
+  
+  def unpark(self):
+    if self.level is None:
+      self.vehicle = None
+      return
+    with self.level.locks[self.vehicle_type]:
+      if self.vehicle is not None:
+        self.vehicle = None
+        self.level.add_free_spot(self)
+        if self.level.observers:
+          self.level.notify(UNPARK, self)
+
+  def _park(self, vehicle):
     if self.is_available() and self.vehicle_type == vehicle.vehicle_type:
       self.vehicle = vehicle
       return True
     return False
-  
-  def unpark(self):
-    self.vehicle = None
 
-# 3. Parking Level -> get_available_spot(), get_available_spots()
-class ParkingLevel:
+# Occupancy events -> every park/unpark on a level is pushed to its observers
+# (Observer pattern). Events are sent while the spot's shard lock is held, so
+# each level and vehicle type sees its events in order; observers must be cheap.
+PARK = "park"
+UNPARK = "unpark"
+
+class OccupancyEvent:
+  __slots__ = ("kind", "level_number", "vehicle_type", "spot", "timestamp")
+
+  def __init__(self, kind, level_number, vehicle_type, spot, timestamp):
+    self.kind = kind
+    self.level_number = level_number
+    self.vehicle_type = vehicle_type
+    self.spot = spot
+    self.timestamp = timestamp
+
+  @property
+  def delta(self):
+    return 1 if self.kind == PARK else -1
+
+class OccupancyObserver(ABC):
+  def add_level(self, level):
+    """Called once for every level the observer starts watching, with all of
+    the level's shard locks held, so no event is missed or counted twice."""
+    pass
+
+  @abstractmethod
+  def update(self, event):
+    pass
+
+class OccupancySubject:
+  def attach(self, observer):
+    self.observers.append(observer)
+
+  def subscribe(self, observer):
+    # seed the observer and start sending it events in one step: no park or
+    # unpark can run on this level in between (locks taken in VehicleType order)
+    with ExitStack() as stack:
+      for vehicle_type in VehicleType:
+        stack.enter_context(self.locks[vehicle_type])
+      observer.add_level(self)
+      self.attach(observer)
+
+  def detach(self, observer):
+    self.observers.remove(observer)
+
+  def notify(self, kind, spot):
+    event = OccupancyEvent(kind, self.level_number, spot.vehicle_type, spot, time.time())
+    for observer in self.observers:
+      observer.update(event)
+
+# 3. Parking Level -> get_available_spot(), get_available_spots(), park_vehicle()
+# Free spots are kept in one pool per VehicleType. A pool is a stack plus each
+# spot's pool_index, so taking the top, removing any spot and pushing one back
+# are all O(1) and the counters are just len(pool).
+# Each pool has its own lock (sharded per level and vehicle type), so gates
+# admitting different types or on different levels never wait on each other.
+class ParkingLevel(OccupancySubject):
   def __init__(self, level_number, spots):
     self.level_number = level_number
     self.spots = spots
-    for spot in self.spots:
+    self.free_spots = {vehicle_type: [] for vehicle_type in VehicleType}
+    self.locks = {vehicle_type: Lock() for vehicle_type in VehicleType}
+    self.capacity = {vehicle_type: 0 for vehicle_type in VehicleType}
+    self.observers = []
+    # push in reverse so the first spot in the list is handed out first
+    for index in range(len(self.spots) - 1, -1, -1):
+      spot = self.spots[index]
       spot.level_number = level_number
+      spot.level = self
+      spot.index = index
+      self.capacity[spot.vehicle_type] += 1
+      if spot.is_available():
+        self.add_free_spot(spot)
+
+  def add_free_spot(self, spot):
+    pool = self.free_spots[spot.vehicle_type]
+    spot.pool_index = len(pool)
+    pool.append(spot)
+
+  def remove_free_spot(self, spot):
+    pool = self.free_spots[spot.vehicle_type]
+    last = pool.pop()
+    if last is not spot:
+      pool[spot.pool_index] = last
+      last.pool_index = spot.pool_index
+    spot.pool_index = -1
   
   def get_available_spot(self, vehicle_type):
-    for spot in self.spots:
-      if spot.is_available() and spot.vehicle_type == vehicle_type:
-        return spot
-    return None
+    pool = self.free_spots[vehicle_type]
+    return pool[-1] if pool else None
+
+  def park_vehicle(self, vehicle):
+    # take a spot and park in one step so two gates can never get the same spot
+    pool = self.free_spots[vehicle.vehicle_type]
+    if not pool:
+      return None
+    with self.locks[vehicle.vehicle_type]:
+      if not pool:
+        return None
+      spot = pool[-1]
+      if spot.vehicle is not None:
+        raise RuntimeError(f"spot {spot.spot_number} in the free pool is taken")
+      spot.vehicle = vehicle
+      self.remove_free_spot(spot)
+      if self.observers:
+        self.notify(PARK, spot)
+      return spot
   
   def get_available_spots(self, vehicle_type):
-    return [spot.spot_number for spot in self.spots
-                if spot.is_available() and spot.vehicle_type == vehicle_type]
+    return [spot.spot_number for spot in reversed(self.free_spots[vehicle_type])]
+
+  def check_pools(self):
+    # problems in the free pools (empty when consistent); only meaningful while no gate runs
+    problems = []
+    for vehicle_type, pool in self.free_spots.items():
+      if len(set(map(id, pool))) != len(pool):
+        problems.append(f"level {self.level_number} {vehicle_type.name}: a spot is pooled twice")
+      for position, spot in enumerate(pool):
+        if spot.vehicle is not None or spot.pool_index != position or spot.vehicle_type != vehicle_type:
+          problems.append(f"level {self.level_number}: pooled spot {spot.spot_number} is inconsistent")
+    free = sum(1 for spot in self.spots if spot.vehicle is None)
+    if free != self.available_count():
+      problems.append(f"level {self.level_number}: {free} free spots but {self.available_count()} pooled")
+    return problems
+
+  def free_count(self, vehicle_type):
+    return len(self.free_spots[vehicle_type])
+
+  def available_count(self):
+    return sum(len(pool) for pool in self.free_spots.values())
 
 # 4. Ticket -> ticket_id, vehicle, spot, entry and exit time, duration_hours()
 class Ticket:
+  __slots__ = ("ticket_id", "spot", "vehicle", "entry_timestamp", "exit_timestamp")
+
   def __init__(self, ticket_id, spot, vehicle):
     self.ticket_id = ticket_id
     self.spot = spot
@@ -82,15 +234,168 @@ class Ticket:
     hours = (self.exit_timestamp - self.entry_timestamp) / 3600.0
     return hours if hours >= 1.0 else 1.0
 
+# Ticket store -> issue(), pop(), in_entry_range()
+# Ticket IDs come from a monotonic counter (64-bit ints) instead of uuid4
+# strings; string IDs are still accepted wherever a ticket is looked up.
+# Next to the id -> Ticket dict, ids and entry times are appended to packed
+# arrays in issue order, which is also entry-time order, so a range scan is a
+# bisect. Released tickets are skipped lazily and the arrays are compacted once
+# most of them are dead. The store lock only covers the id bump and two appends.
+class TicketStore:
+  def __init__(self, first_id=1):
+    self.next_id = first_id
+    self.tickets = {}
+    self.entry_ids = array("Q")
+    self.entry_times = array("d")
+    self.lock = Lock()
+
+  @staticmethod
+  def normalize(ticket_id):
+    return ticket_id if isinstance(ticket_id, int) else int(ticket_id)
+
+  def issue(self, spot, vehicle):
+    with self.lock:
+      ticket = Ticket(self.next_id, spot, vehicle)
+      self.next_id += 1
+      self._index(ticket)
+    return ticket
+
+  def restore(self, ticket):
+    # used by recovery; tickets must come back in id order
+    with self.lock:
+      self.next_id = max(self.next_id, ticket.ticket_id + 1)
+      self._index(ticket)
+
+  def _index(self, ticket):
+    self.tickets[ticket.ticket_id] = ticket
+    # keep the time column sorted even if the wall clock steps back
+    entry = ticket.entry_timestamp
+    if self.entry_times and entry < self.entry_times[-1]:
+      entry = self.entry_times[-1]
+    self.entry_ids.append(ticket.ticket_id)
+    self.entry_times.append(entry)
+
+  def get(self, ticket_id, default=None):
+    try:
+      return self.tickets.get(self.normalize(ticket_id), default)
+    except (TypeError, ValueError):
+      return default
+
+  def pop(self, ticket_id, default=None):
+    try:
+      ticket = self.tickets.pop(self.normalize(ticket_id), default)
+    except (TypeError, ValueError):
+      return default
+    if ticket is not default and len(self.entry_ids) > 1024 and len(self.tickets) * 4 < len(self.entry_ids):
+      self._compact()
+    return ticket
+
+  def _compact(self):
+    with self.lock:
+      live = [(ticket_id, entry) for ticket_id, entry in zip(self.entry_ids, self.entry_times)
+              if ticket_id in self.tickets]
+      self.entry_ids = array("Q", [ticket_id for ticket_id, _ in live])
+      self.entry_times = array("d", [entry for _, entry in live])
+
+  def in_entry_range(self, start, end):
+    # active tickets with start <= entry_timestamp < end, oldest first
+    with self.lock:
+      ids, times = self.entry_ids, self.entry_times
+      lo, hi = bisect_left(times, start), bisect_left(times, end)
+      candidates = ids[lo:hi]
+    for ticket_id in candidates:
+      ticket = self.tickets.get(ticket_id)
+      if ticket and start <= ticket.entry_timestamp < end:
+        yield ticket
+
+  def values(self):
+    return list(self.tickets.values())
+
+  def __contains__(self, ticket_id):
+    return self.get(ticket_id) is not None
+
+  def __len__(self):
+    return len(self.tickets)
+
+  def __iter__(self):
+    return iter(list(self.tickets))
+
 # 5. Payment -> FeeStrategy,
 from abc import ABC, abstractmethod
 
+# Batch settlement: calculate_fees() takes columns (entry timestamps, exit
+# timestamps, vehicle types) and prices them in one pass, with NumPy when it is
+# installed. It uses the same float operations as calculate_fee(), so the
+# results are identical. Strategies without a per-type hourly rate (rate_for()
+# returns None), or whose calculate_fee() comes from a different class than
+# rate_for() (a subclass that changes one but not the other), are settled with
+# calculate_fee() one item at a time.
 class FeeStrategy(ABC):
     @abstractmethod
     def calculate_fee(self, ticket):
         """Compute the fee for a given ticket."""
         pass
 
+    def rate_for(self, vehicle_type):
+        """Hourly rate for a vehicle type, or None if fees are not a plain hourly rate."""
+        return None
+
+    def defining_class(self, name):
+        return next(klass for klass in type(self).__mro__ if name in vars(klass))
+
+    def rate_table(self):
+        # rate per vehicle type code, or None when batch pricing does not apply
+        if self.defining_class("calculate_fee") is not self.defining_class("rate_for"):
+            return None
+        table = [0.0] * (max(VEHICLE_TYPES) + 1)
+        for code, vehicle_type in VEHICLE_TYPES.items():
+            rate = self.rate_for(vehicle_type)
+            if rate is None:
+                return None
+            table[code] = float(rate)
+        return table
+
+    @staticmethod
+    def type_codes(vehicle_types):
+        # packed columns already hold codes; anything else is normalized item by item,
+        # so a column may mix VehicleType members and codes
+        if isinstance(vehicle_types, array) or (np is not None and isinstance(vehicle_types, np.ndarray)):
+            return vehicle_types
+        return [vehicle_type.value if isinstance(vehicle_type, VehicleType) else int(vehicle_type)
+                for vehicle_type in vehicle_types]
+
+    def calculate_fees(self, entry_timestamps, exit_timestamps, vehicle_types):
+        codes = self.type_codes(vehicle_types)
+        table = self.rate_table()
+        if table is None:
+            fees = array("d")
+            for entry, exit, code in zip(entry_timestamps, exit_timestamps, codes):
+                ticket = Ticket(None, None, Vehicle(None, VEHICLE_TYPES[int(code)]))
+                ticket.entry_timestamp, ticket.exit_timestamp = entry, exit
+                fees.append(self.calculate_fee(ticket))
+            return fees
+        if np is not None:
+            hours = (np.asarray(exit_timestamps, dtype=np.float64)
+                     - np.asarray(entry_timestamps, dtype=np.float64)) / 3600.0
+            hours = np.where(hours >= 1.0, hours, 1.0)
+            fees = hours * np.asarray(table)[np.asarray(codes, dtype=np.intp)]
+            return array("d", fees.tobytes())
+        return array("d", [(hours if (hours := (exit - entry) / 3600.0) >= 1.0 else 1.0) * table[code]
+                           for entry, exit, code in zip(entry_timestamps, exit_timestamps, codes)])
+
+    def settle_tickets(self, tickets):
+        for ticket in tickets:
+            if ticket.exit_timestamp is None:
+                raise ValueError("Ticket is still active")
+        if self.rate_table() is None:
+            return array("d", [self.calculate_fee(ticket) for ticket in tickets])
+        entries, exits, codes = array("d"), array("d"), array("b")
+        for ticket in tickets:
+            entries.append(ticket.entry_timestamp)
+            exits.append(ticket.exit_timestamp)
+            codes.append(ticket.vehicle.vehicle_type.value)
+        return self.calculate_fees(entries, exits, codes)
+
 class FlatRateFeeStrategy(FeeStrategy):
   def __init__(self, rate_per_hour=10.0):
     self.rate_per_hour = rate_per_hour
@@ -98,6 +403,9 @@ class FlatRateFeeStrategy(FeeStrategy):
   def calculate_fee(self, ticket):
     return ticket.duration_hours() * self.rate_per_hour
 
+  def rate_for(self, vehicle_type):
+    return self.rate_per_hour
+
 # Optional
 class VehicleBasedFeeStrategy(FeeStrategy):
   def __init__(self):
@@ -111,26 +419,78 @@ class VehicleBasedFeeStrategy(FeeStrategy):
     rate = self.rates.get(ticket.vehicle.vehicle_type, 0)
     return ticket.duration_hours() * rate
 
-# 6. Parking Lot -> levels, add_level(), admit_vehicle(), release_vehicle()
+  def rate_for(self, vehicle_type):
+    return self.rates.get(vehicle_type, 0)
+
+# 6. Placement -> PlacementStrategy, decides the order in which levels are tried
+class PlacementStrategy(ABC):
+  @abstractmethod
+  def order_levels(self, levels):
+    """Return the levels in the order admit_vehicle should try them."""
+    pass
+
+class LowestLevelFirstStrategy(PlacementStrategy):
+  def order_levels(self, levels):
+    return sorted(levels, key=lambda level: level.level_number)
+
+class NearestToExitStrategy(PlacementStrategy):
+  def __init__(self, exit_level=1):
+    self.exit_level = exit_level
+
+  def order_levels(self, levels):
+    return sorted(levels, key=lambda level: (abs(level.level_number - self.exit_level),
+                                             level.level_number))
+
+# 7. Parking Lot -> levels, add_level(), admit_vehicle(), release_vehicle()
+# The placement order is computed once per add_level()/set_placement_strategy(),
+# so admission only reads one pool per level and never scans spots.
+# Thread safety: spots are claimed under their level's per-type lock, and
+# active_tickets (a TicketStore) removes a ticket with a single atomic dict
+# pop, so a ticket can be released at most once.
 class ParkingLot:
   def __init__(self):
         self.levels         = []
-        self.active_tickets = {}
+        self.active_tickets = TicketStore()
         self.fee_strategy   = FlatRateFeeStrategy()
+        self.placement_strategy = LowestLevelFirstStrategy()
+        self.level_order    = []
+        self.journal        = None  # optional TicketJournal, see journal.py
+        self.observers      = []    # occupancy observers, attached to every level
   
   def set_fee_strategy(self, strategy):
         self.fee_strategy = strategy
 
+  def set_placement_strategy(self, strategy):
+    self.placement_strategy = strategy
+    self.level_order = strategy.order_levels(self.levels)
+
+  def attach(self, observer):
+    self.observers.append(observer)
+    for level in self.levels:
+      level.subscribe(observer)
+
+  def detach(self, observer):
+    self.observers.remove(observer)
+    for level in self.levels:
+      level.detach(observer)
+
   def add_level(self, level):
     self.levels.append(level)
+    for observer in self.observers:
+      level.subscribe(observer)
+    self.level_order = self.placement_strategy.order_levels(self.levels)
+    if self.journal:
+      self.journal.snapshot(self)
   
   def admit_vehicle(self, vehicle):
-    for level in self.levels:
-      spot = level.get_available_spot(vehicle.vehicle_type)
-      if spot and spot.park(vehicle):
-        ticket_id = str(uuid.uuid4())
-        ticket = Ticket(ticket_id, spot, vehicle)
-        self.active_tickets[ticket_id] = ticket
+    if self.journal:
+      self.journal.check_vehicle(vehicle)
+    for level in self.level_order:
+      spot = level.park_vehicle(vehicle)
+      if spot:
+        ticket = self.active_tickets.issue(spot, vehicle)
+        if self.journal:
+          self.journal.record_admit(ticket)
         return ticket
     raise Exception(f"No available spot for {vehicle.vehicle_type.name}")
   
@@ -139,13 +499,38 @@ class ParkingLot:
     if not ticket:
       raise Exception("Invalid ticket")
     ticket.set_exit()
-    fee = self.fee_strategy.calculate_fee(ticket)
-    ticket.spot.unpark()
-    return fee
+    try:
+      return self.fee_strategy.calculate_fee(ticket)
+    finally:
+      # the ticket is gone from the store, so the spot goes back even if pricing fails
+      ticket.spot.unpark()
+      if self.journal:
+        self.journal.record_release(ticket)
+
+  def release_vehicles(self, ticket_ids):
+    # batch release: fee per ticket id in order, None for an invalid ticket;
+    # the fees are settled together with one fee_strategy.settle_tickets() pass
+    fees = [None] * len(ticket_ids)
+    tickets, positions = [], []
+    for position, ticket_id in enumerate(ticket_ids):
+      ticket = self.active_tickets.pop(ticket_id, None)
+      if ticket:
+        ticket.set_exit()
+        tickets.append(ticket)
+        positions.append(position)
+    try:
+      for position, fee in zip(positions, self.fee_strategy.settle_tickets(tickets)):
+        fees[position] = fee
+    finally:
+      for ticket in tickets:
+        ticket.spot.unpark()
+        if self.journal:
+          self.journal.record_release(ticket)
+    return fees
   
   def display_availability(self):
         for level in self.levels:
-            free = sum(1 for s in level.spots if s.is_available())
+            free = level.available_count()
             total = len(level.spots)
             print(f"Level {level.level_number} — {free}/{total} spots free")
 
@@ -158,6 +543,317 @@ class SpotFactory:
         spot_id = f"{self.prefix}{next(self._counter)}"
         return ParkingSpot(spot_id, vehicle_type)
 
+# 8. Compact storage -> CompactParkingLevel, SpotView
+# Same interface as ParkingLevel for lots with millions of spots. Spot types are
+# one byte each, occupancy is a bitmap, free pools are int arrays (stack plus
+# position, like ParkingLevel) and vehicles are only stored for taken spots.
+# ParkingSpot-like SpotView objects are created on demand.
+class SpotView:
+  __slots__ = ("level", "index")
+
+  def __init__(self, level, index):
+    self.level = level
+    self.index = index
+
+  @property
+  def spot_number(self):
+    return f"{self.level.prefix}{self.index + 1}"
+
+  @property
+  def vehicle_type(self):
+    return VEHICLE_TYPES[self.level.types[self.index]]
+
+  @property
+  def vehicle(self):
+    return self.level.vehicles.get(self.index)
+
+  @property
+  def level_number(self):
+    return self.level.level_number
+
+  def is_available(self):
+    return not self.level.is_occupied(self.index)
+
+  def park(self, vehicle):
+    return self.level.park_spot(self.index, vehicle)
+
+  def unpark(self):
+    self.level.unpark_spot(self.index)
+
+  def __eq__(self, other):
+    return isinstance(other, SpotView) and self.level is other.level and self.index == other.index
+
+  def __hash__(self):
+    return hash((id(self.level), self.index))
+
+class CompactSpots(Sequence):
+  def __init__(self, level):
+    self.level = level
+
+  def __len__(self):
+    return len(self.level.types)
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return [SpotView(self.level, i) for i in range(*index.indices(len(self)))]
+    if index < 0:
+      index += len(self)
+    if not 0 <= index < len(self):
+      raise IndexError("spot index out of range")
+    return SpotView(self.level, index)
+
+class CompactParkingLevel(OccupancySubject):
+  def __init__(self, level_number, spot_types, prefix="S"):
+    self.level_number = level_number
+    self.prefix = prefix
+    self.types = bytearray(vehicle_type.value for vehicle_type in spot_types)
+    size = len(self.types)
+    self.occupied = bytearray((size + 7) // 8)
+    self.vehicles = {}
+    self.pool_index = array("i", [-1]) * size
+    self.free_spots = {vehicle_type: array("i") for vehicle_type in VehicleType}
+    self.locks = {vehicle_type: Lock() for vehicle_type in VehicleType}
+    self.observers = []
+    for index in range(size - 1, -1, -1):
+      self._add_free(index)
+    self.capacity = {vehicle_type: len(self.free_spots[vehicle_type]) for vehicle_type in VehicleType}
+
+  @property
+  def spots(self):
+    return CompactSpots(self)
+
+  def is_occupied(self, index):
+    return self.occupied[index >> 3] & (1 << (index & 7)) != 0
+
+  def _add_free(self, index):
+    pool = self.free_spots[VEHICLE_TYPES[self.types[index]]]
+    self.pool_index[index] = len(pool)
+    pool.append(index)
+
+  def _remove_free(self, index):
+    pool = self.free_spots[VEHICLE_TYPES[self.types[index]]]
+    last = pool.pop()
+    if last != index:
+      position = self.pool_index[index]
+      pool[position] = last
+      self.pool_index[last] = position
+    self.pool_index[index] = -1
+
+  def _occupy(self, index, vehicle):
+    self.occupied[index >> 3] |= 1 << (index & 7)
+    self.vehicles[index] = vehicle
+    self._remove_free(index)
+    if self.observers:
+      self.notify(PARK, SpotView(self, index))
+
+  def park_spot(self, index, vehicle):
+    if self.types[index] != vehicle.vehicle_type.value:
+      return False
+    with self.locks[vehicle.vehicle_type]:
+      if self.is_occupied(index):
+        return False
+      self._occupy(index, vehicle)
+      return True
+
+  def unpark_spot(self, index):
+    with self.locks[VEHICLE_TYPES[self.types[index]]]:
+      if not self.is_occupied(index):
+        return
+      self.occupied[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+      del self.vehicles[index]
+      self._add_free(index)
+      if self.observers:
+        self.notify(UNPARK, SpotView(self, index))
+
+  def get_available_spot(self, vehicle_type):
+    pool = self.free_spots[vehicle_type]
+    return SpotView(self, pool[-1]) if pool else None
+
+  def park_vehicle(self, vehicle):
+    pool = self.free_spots[vehicle.vehicle_type]
+    if not pool:
+      return None
+    with self.locks[vehicle.vehicle_type]:
+      if not pool:
+        return None
+      index = pool[-1]
+      self._occupy(index, vehicle)
+      return SpotView(self, index)
+
+  def get_available_spots(self, vehicle_type):
+    return [f"{self.prefix}{index + 1}" for index in reversed(self.free_spots[vehicle_type])]
+
+  def free_count(self, vehicle_type):
+    return len(self.free_spots[vehicle_type])
+
+  def available_count(self):
+    return sum(len(pool) for pool in self.free_spots.values())
+
+# 9. Occupancy metrics -> OccupancyMetrics, RollingOccupancy, OccupancyStream
+# Observers fed by the park/unpark events above. Dashboards read counters and
+# a fixed ring of time buckets instead of rescanning spots.
+class RollingOccupancy:
+  # one ring slot per bucket_seconds covering the last window_seconds; each
+  # bucket keeps parks, unparks, peak occupancy and occupancy x seconds
+  EMPTY = -(1 << 62)
+
+  def __init__(self, window_seconds=3600, bucket_seconds=60, occupied=0, now=None):
+    self.bucket_seconds = bucket_seconds
+    self.size = max(1, -(-window_seconds // bucket_seconds))
+    self.bucket_ids = array("q", [self.EMPTY]) * self.size
+    self.parks = array("l", [0]) * self.size
+    self.unparks = array("l", [0]) * self.size
+    self.peak = array("l", [0]) * self.size
+    self.area = array("d", [0.0]) * self.size
+    self.seconds = array("d", [0.0]) * self.size
+    self.occupied = occupied
+    self.last_time = time.time() if now is None else now
+
+  def _slot(self, bucket_id):
+    slot = bucket_id % self.size
+    if self.bucket_ids[slot] != bucket_id:
+      self.bucket_ids[slot] = bucket_id
+      self.parks[slot] = self.unparks[slot] = 0
+      self.peak[slot] = self.occupied
+      self.area[slot] = self.seconds[slot] = 0.0
+    return slot
+
+  def advance(self, now):
+    # spread occupancy x elapsed time over the buckets between last_time and now
+    if now <= self.last_time:
+      return self._slot(int(self.last_time // self.bucket_seconds))
+    start = self.last_time
+    first = int(start // self.bucket_seconds)
+    last = int(now // self.bucket_seconds)
+    first = max(first, last - self.size)
+    for bucket_id in range(first, last + 1):
+      slot = self._slot(bucket_id)
+      begin = max(start, bucket_id * self.bucket_seconds)
+      end = min(now, (bucket_id + 1) * self.bucket_seconds)
+      if end > begin:
+        self.area[slot] += self.occupied * (end - begin)
+        self.seconds[slot] += end - begin
+    self.last_time = now
+    return slot
+
+  def record(self, delta, now):
+    slot = self.advance(now)
+    self.occupied += delta
+    if delta > 0:
+      self.parks[slot] += 1
+      if self.occupied > self.peak[slot]:
+        self.peak[slot] = self.occupied
+    else:
+      self.unparks[slot] += 1
+
+  def buckets(self, now=None):
+    now = time.time() if now is None else now
+    self.advance(now)
+    current = int(now // self.bucket_seconds)
+    result = []
+    for bucket_id in range(current - self.size + 1, current + 1):
+      slot = bucket_id % self.size
+      if self.bucket_ids[slot] != bucket_id:
+        continue
+      seconds = self.seconds[slot]
+      result.append({"start": bucket_id * self.bucket_seconds, "parks": self.parks[slot],
+                     "unparks": self.unparks[slot], "peak": self.peak[slot],
+                     "mean": self.area[slot] / seconds if seconds > 0 else float(self.occupied)})
+    return result
+
+class OccupancyShard:
+  # counters of one (level, vehicle type) shard, guarded by that shard's lock
+  # in the level
+  __slots__ = ("lock", "capacity", "window")
+
+  def __init__(self, lock, capacity, window):
+    self.lock = lock
+    self.capacity = capacity
+    self.window = window
+
+  @property
+  def occupied(self):
+    return self.window.occupied
+
+class OccupancyMetrics(OccupancyObserver):
+  # One OccupancyShard per (level, vehicle type). update() runs under the
+  # level's lock for that shard and only touches that shard, so gates stay as
+  # independent as they are without metrics. Reads merge the shards; the
+  # histogram takes each shard lock briefly while it copies the buckets, and
+  # its peak is the sum of the shard peaks (an upper bound on the lot peak).
+  def __init__(self, window_seconds=3600, bucket_seconds=60):
+    self.window_seconds = window_seconds
+    self.bucket_seconds = bucket_seconds
+    self.shards = {}   # (level_number, vehicle_type) -> OccupancyShard
+
+  def add_level(self, level):
+    # the level's shard locks are held by OccupancySubject.subscribe()
+    for vehicle_type in VehicleType:
+      capacity = level.capacity[vehicle_type]
+      window = RollingOccupancy(self.window_seconds, self.bucket_seconds,
+                                occupied=capacity - level.free_count(vehicle_type))
+      self.shards[level.level_number, vehicle_type] = OccupancyShard(level.locks[vehicle_type],
+                                                                    capacity, window)
+
+  def update(self, event):
+    self.shards[event.level_number, event.vehicle_type].window.record(event.delta, event.timestamp)
+
+  def _select(self, level_number=None, vehicle_type=None):
+    return [shard for (number, kind), shard in list(self.shards.items())
+            if (level_number is None or number == level_number)
+            and (vehicle_type is None or kind == vehicle_type)]
+
+  def free(self, level_number=None, vehicle_type=None):
+    return sum(shard.capacity - shard.occupied for shard in self._select(level_number, vehicle_type))
+
+  def snapshot(self):
+    levels, types = {}, {vehicle_type.name: {"occupied": 0, "capacity": 0} for vehicle_type in VehicleType}
+    for (level_number, vehicle_type), shard in list(self.shards.items()):
+      occupied, capacity = shard.occupied, shard.capacity
+      level = levels.setdefault(level_number, {"occupied": 0, "capacity": 0})
+      level["occupied"] += occupied
+      level["capacity"] += capacity
+      types[vehicle_type.name]["occupied"] += occupied
+      types[vehicle_type.name]["capacity"] += capacity
+    return {"occupied": sum(level["occupied"] for level in levels.values()),
+            "levels": levels, "types": types}
+
+  def histogram(self, now=None):
+    now = time.time() if now is None else now
+    merged = {}
+    for shard in list(self.shards.values()):
+      with shard.lock:
+        buckets = shard.window.buckets(now)
+      for bucket in buckets:
+        total = merged.setdefault(bucket["start"], {"start": bucket["start"], "parks": 0, "unparks": 0,
+                                                    "peak": 0, "mean": 0.0})
+        for key in ("parks", "unparks", "peak", "mean"):
+          total[key] += bucket[key]
+    return [merged[start] for start in sorted(merged)]
+
+class OccupancyStream(OccupancyObserver):
+  # buffers events for a consumer that polls with drain(); when the consumer
+  # falls more than maxlen events behind, the oldest are dropped and counted.
+  # Gates on different shards append concurrently, so the buffer has its own
+  # lock (held only for the append).
+  def __init__(self, maxlen=100000):
+    self.events = deque()
+    self.maxlen = maxlen
+    self.dropped = 0
+    self.lock = Lock()
+
+  def update(self, event):
+    with self.lock:
+      if len(self.events) >= self.maxlen:
+        self.events.popleft()
+        self.dropped += 1
+      self.events.append(event)
+
+  def drain(self, limit=None):
+    with self.lock:
+      count = len(self.events) if limit is None else min(limit, len(self.events))
+      return [self.events.popleft() for _ in range(count)]
+
 class Parking:
   @staticmethod
   def run():
@@ -195,5 +891,84 @@ class Parking:
     print(f"Unparked CAR-AAA from level {t1.spot.level_number}, fee = ${fee1:.2f}")
     lot1.display_availability()
 
+  @staticmethod
+  def stress(gates=8, rounds=2000, spots_per_type=5, locked=True):
+    # many gates admit and release against a tiny lot; every claimed spot is
+    # recorded and a second claim of a spot that is still held is a double booking.
+    # Errors raised inside a gate (a pooled spot that is already taken, a broken
+    # pool) are failures too, and the pools are checked for consistency at the end.
+    # locked=False swaps the shard locks for no-ops; the run must then fail.
+    class YieldingLevel(ParkingLevel):
+      # gives up the GIL between claiming a spot and taking it out of the pool,
+      # so an unguarded claim reliably overlaps with another gate's
+      def remove_free_spot(self, spot):
+        time.sleep(0)
+        super().remove_free_spot(spot)
+
+    lot = ParkingLot()
+    for level_number in (1, 2):
+      factory = SpotFactory(f"L{level_number}-")
+      level = YieldingLevel(level_number, [factory.make_spot(vehicle_type)
+                                           for vehicle_type in VehicleType
+                                           for _ in range(spots_per_type)])
+      if not locked:
+        level.locks = {vehicle_type: nullcontext() for vehicle_type in VehicleType}
+      lot.add_level(level)
+    vehicle_classes = [Car, Truck, Bike]
+    holders = {}
+    double_booked = []
+    errors = []
+
+    def gate(gate_id):
+      rng = random.Random(gate_id)
+      held = []
+      try:
+        for i in range(rounds):
+          if held and (rng.random() < 0.5 or len(held) > 3):
+            ticket = held.pop(rng.randrange(len(held)))
+            holders.pop(id(ticket.spot), None)
+            lot.release_vehicle(ticket.ticket_id)
+            continue
+          vehicle = rng.choice(vehicle_classes)(f"G{gate_id}-{i}")
+          try:
+            ticket = lot.admit_vehicle(vehicle)
+          except Exception as e:
+            if str(e).startswith("No available spot"):
+              continue
+            raise
+          owner = holders.setdefault(id(ticket.spot), vehicle.license_plate)
+          if owner != vehicle.license_plate:
+            double_booked.append((ticket.spot.spot_number, owner, vehicle.license_plate))
+          held.append(ticket)
+        for ticket in held:
+          holders.pop(id(ticket.spot), None)
+          lot.release_vehicle(ticket.ticket_id)
+      except Exception as e:
+        errors.append(f"gate {gate_id}: {type(e).__name__}: {e}")
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # force frequent thread switches
+    try:
+      threads = [Thread(target=gate, args=(g,)) for g in range(gates)]
+      for t in threads:
+        t.start()
+      for t in threads:
+        t.join()
+    finally:
+      sys.setswitchinterval(interval)
+
+    total = sum(len(level.spots) for level in lot.levels)
+    free = sum(level.available_count() for level in lot.levels)
+    problems = [problem for level in lot.levels for problem in level.check_pools()]
+    print(f"{gates} gates x {rounds} rounds: {len(double_booked)} double bookings, {len(errors)} gate errors, "
+          f"{len(problems)} pool problems, {free}/{total} spots free, {len(lot.active_tickets)} open tickets")
+    assert not double_booked, double_booked[:5]
+    assert not errors, errors[:5]
+    assert not problems, problems[:5]
+    assert free == total and not lot.active_tickets
+
 if __name__ == "__main__":
+  if sys.argv[1:2] == ["stress"]:
+    Parking.stress(locked="--unlocked" not in sys.argv)
+  else:
     Parking.run()
\ No newline at end of file
@@ -0,0 +1,242 @@
+# Federation -> many ParkingLots sharded across worker processes
+#
+# Every worker process owns a subset of the lots (lot i lives on worker
+# i % workers) and is the only writer of those lots. After each batch it
+# publishes the free spots per (lot, VehicleType) into a shared-memory array,
+# so the router picks a lot with capacity without asking every worker.
+#
+# Requests travel in batches: admit_many()/release_many() split the work per
+# worker, send every worker its share first and only then collect the replies,
+# so all workers run in parallel. Ticket ids are "<lot>:<ticket_id>".
+#
+#   python federation.py --workers 1 2 4 8 --lots 32 --ops 400000
+import argparse
+import multiprocessing
+import time
+from collections import defaultdict
+
+from design import (VEHICLE_TYPES, VehicleType, Car, Truck, Bike, ParkingLot, ParkingLevel,
+                    SpotFactory, VehicleBasedFeeStrategy)
+
+VEHICLE_CLASSES = {VehicleType.CAR: Car, VehicleType.TRUCK: Truck, VehicleType.BIKE: Bike}
+TYPE_COUNT = len(VehicleType)
+ADMIT = 1
+RELEASE = 2
+
+class LotSpec:
+  # picklable recipe for a lot; the lot itself (with its locks) is built inside the worker
+  def __init__(self, name, levels, spots_per_level, mix=(6, 1, 3)):
+    self.name = name
+    self.levels = levels
+    self.spots_per_level = spots_per_level
+    self.mix = mix  # CAR, TRUCK, BIKE weights
+
+  def build(self):
+    lot = ParkingLot()
+    lot.set_fee_strategy(VehicleBasedFeeStrategy())
+    pattern = [vehicle_type for vehicle_type, weight in zip(VehicleType, self.mix)
+               for _ in range(weight)]
+    for level_number in range(1, self.levels + 1):
+      factory = SpotFactory(f"{self.name}-L{level_number}-")
+      lot.add_level(ParkingLevel(level_number, [factory.make_spot(pattern[i % len(pattern)])
+                                                for i in range(self.spots_per_level)]))
+    return lot
+
+def counter_index(lot_index, vehicle_type):
+  return lot_index * TYPE_COUNT + vehicle_type.value - 1
+
+def publish(free, lot_index, lot, vehicle_type):
+  free[counter_index(lot_index, vehicle_type)] = sum(level.free_count(vehicle_type) for level in lot.levels)
+
+def worker_main(conn, specs, free):
+  lots = {lot_index: spec.build() for lot_index, spec in specs.items()}
+  for lot_index, lot in lots.items():
+    for vehicle_type in VehicleType:
+      publish(free, lot_index, lot, vehicle_type)
+  while True:
+    batch = conn.recv()
+    if batch is None:
+      break
+    replies = []
+    touched = set()
+    for op, lot_index, payload in batch:
+      try:
+        lot = lots[lot_index]
+        if op == ADMIT:
+          plate, code = payload
+          vehicle_type = VEHICLE_TYPES[code]
+          ticket = lot.admit_vehicle(VEHICLE_CLASSES[vehicle_type](plate))
+          replies.append((ticket.ticket_id, ticket.spot.level_number, ticket.spot.spot_number))
+        else:
+          ticket = lot.active_tickets.get(payload)
+          vehicle_type = ticket.vehicle.vehicle_type if ticket else None
+          replies.append(lot.release_vehicle(payload))
+        touched.add((lot_index, vehicle_type))
+      except Exception:
+        replies.append(None)
+    for lot_index, vehicle_type in touched:
+      if vehicle_type is not None:
+        publish(free, lot_index, lots[lot_index], vehicle_type)
+    conn.send(replies)
+  conn.close()
+
+class ParkingFederation:
+  def __init__(self, specs, workers=4):
+    self.specs = list(specs)
+    self.workers = min(workers, len(self.specs))
+    context = multiprocessing.get_context()
+    # one writer per slot (the owning worker), so no lock is needed
+    self.free = context.Array("l", len(self.specs) * TYPE_COUNT, lock=False)
+    self.connections = []
+    self.processes = []
+    for worker in range(self.workers):
+      owned = {lot_index: spec for lot_index, spec in enumerate(self.specs)
+               if lot_index % self.workers == worker}
+      parent, child = context.Pipe()
+      process = context.Process(target=worker_main, args=(child, owned, self.free), daemon=True)
+      process.start()
+      child.close()
+      self.connections.append(parent)
+      self.processes.append(process)
+    # wait until every worker has built its lots and published its counters
+    for connection in self.connections:
+      connection.send([])
+    for connection in self.connections:
+      connection.recv()
+
+  # 1. Routing
+  def pick_lot(self, vehicle_type, planned=None, exclude=()):
+    # lot with the most free spots for the type, minus what this batch already sent there
+    best, best_free = None, 0
+    for lot_index in range(len(self.specs)):
+      if lot_index in exclude:
+        continue
+      free = self.free[counter_index(lot_index, vehicle_type)]
+      if planned:
+        free -= planned[lot_index, vehicle_type]
+      if free > best_free:
+        best, best_free = lot_index, free
+    return best
+
+  def _run(self, requests):
+    # requests: list of (op, lot_index, payload); returns replies in the same order
+    per_worker = defaultdict(list)
+    for position, (op, lot_index, payload) in enumerate(requests):
+      per_worker[lot_index % self.workers].append((position, (op, lot_index, payload)))
+    for worker, items in per_worker.items():
+      self.connections[worker].send([request for _, request in items])
+    replies = [None] * len(requests)
+    for worker, items in per_worker.items():
+      for (position, _), reply in zip(items, self.connections[worker].recv()):
+        replies[position] = reply
+    return replies
+
+  # 2. Public API
+  def admit_many(self, vehicles):
+    tickets = [None] * len(vehicles)
+    pending = list(range(len(vehicles)))
+    tried = defaultdict(set)
+    while pending:
+      planned = defaultdict(int)
+      requests, positions = [], []
+      for position in pending:
+        vehicle = vehicles[position]
+        lot_index = self.pick_lot(vehicle.vehicle_type, planned, tried[position])
+        if lot_index is None:
+          continue
+        planned[lot_index, vehicle.vehicle_type] += 1
+        tried[position].add(lot_index)
+        requests.append((ADMIT, lot_index, (vehicle.license_plate, vehicle.vehicle_type.value)))
+        positions.append(position)
+      pending = []
+      for position, request, reply in zip(positions, requests, self._run(requests)):
+        if reply is None:
+          pending.append(position)  # counters were stale, try another lot
+        else:
+          ticket_id, level_number, spot_number = reply
+          tickets[position] = (f"{request[1]}:{ticket_id}", level_number, spot_number)
+    return tickets
+
+  def admit_vehicle(self, vehicle):
+    ticket = self.admit_many([vehicle])[0]
+    if ticket is None:
+      raise Exception(f"No available spot for {vehicle.vehicle_type.name}")
+    return ticket
+
+  def parse_ticket(self, ticket_id):
+    # (lot_index, local ticket id), or None for a malformed id or an unknown lot
+    lot_index, separator, local_id = str(ticket_id).partition(":")
+    if (not separator or not lot_index.isascii() or not lot_index.isdecimal()
+        or int(lot_index) >= len(self.specs)):
+      return None
+    return int(lot_index), local_id
+
+  def release_many(self, ticket_ids):
+    # fee per ticket id, None for an invalid ticket (never sent to a worker)
+    fees = [None] * len(ticket_ids)
+    requests, positions = [], []
+    for position, ticket_id in enumerate(ticket_ids):
+      parsed = self.parse_ticket(ticket_id)
+      if parsed is not None:
+        requests.append((RELEASE, parsed[0], parsed[1]))
+        positions.append(position)
+    for position, fee in zip(positions, self._run(requests)):
+      fees[position] = fee
+    return fees
+
+  def release_vehicle(self, ticket_id):
+    fee = self.release_many([ticket_id])[0]
+    if fee is None:
+      raise Exception("Invalid ticket")
+    return fee
+
+  def availability(self):
+    totals = {vehicle_type: 0 for vehicle_type in VehicleType}
+    for lot_index in range(len(self.specs)):
+      for vehicle_type in VehicleType:
+        totals[vehicle_type] += self.free[counter_index(lot_index, vehicle_type)]
+    return totals
+
+  def close(self):
+    for connection in self.connections:
+      connection.send(None)
+      connection.close()
+    for process in self.processes:
+      process.join()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+# 3. Benchmark -> admit and release ops/second for a growing number of workers
+def benchmark(worker_counts, lots, levels, spots_per_level, ops, batch):
+  specs = [LotSpec(f"P{i}", levels, spots_per_level) for i in range(lots)]
+  kinds = [VehicleType.CAR] * 6 + [VehicleType.TRUCK] + [VehicleType.BIKE] * 3
+  results = []
+  for workers in worker_counts:
+    with ParkingFederation(specs, workers) as federation:
+      done = 0
+      start = time.perf_counter()
+      while done < ops:
+        vehicles = [VEHICLE_CLASSES[kinds[(done + i) % len(kinds)]](f"V{done + i}")
+                    for i in range(batch)]
+        tickets = federation.admit_many(vehicles)
+        federation.release_many([ticket[0] for ticket in tickets if ticket])
+        done += 2 * batch
+      elapsed = time.perf_counter() - start
+    results.append((workers, done / elapsed))
+    print(f"workers {workers:>3}  {done / elapsed:>12,.0f} ops/s")
+  return results
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="benchmark the multi-process parking federation")
+  parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+  parser.add_argument("--lots", type=int, default=32)
+  parser.add_argument("--levels", type=int, default=4)
+  parser.add_argument("--spots", type=int, default=500, help="spots per level")
+  parser.add_argument("--ops", type=int, default=200000)
+  parser.add_argument("--batch", type=int, default=2000)
+  args = parser.parse_args()
+  benchmark(args.workers, args.lots, args.levels, args.spots, args.ops, args.batch)
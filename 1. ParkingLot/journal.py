@@ -0,0 +1,231 @@
+# Ticket journal -> durable admit/release log with snapshots and crash recovery
+#
+# journal.log   append-only, fixed-size records (one per admit or release),
+#               buffered and written in batches of batch_size records
+# snapshot.bin  compact image of the lot: level layout + every active ticket,
+#               plus the sequence number of the last event it covers
+#
+# Every snapshot_every events a new snapshot is written (tmp file + rename)
+# and the journal is truncated, so recovery reads one snapshot and a short
+# journal tail through mmap instead of the lot's full history.
+#
+# Usage:
+#   journal = TicketJournal("state/")
+#   lot = journal.recover() or build_lot()
+#   journal.attach(lot)
+import mmap
+import os
+import struct
+from threading import Lock
+
+from design import (VEHICLE_TYPES, VehicleType, Car, Truck, Bike, Ticket, ParkingLot,
+                    ParkingLevel, ParkingSpot, CompactParkingLevel)
+
+ADMIT = 1
+RELEASE = 2
+
+# seq, event, level_number, spot index, vehicle type, timestamp, ticket id, license plate
+RECORD = struct.Struct("<QBiIBdQ32s")
+SNAPSHOT_HEADER = struct.Struct("<8sQQII")  # magic, last seq, next ticket id, level count, ticket count
+LEVEL_HEADER = struct.Struct("<iBII")       # level_number, kind, spot count, name bytes
+NAME_SIZE = struct.Struct("<H")             # before each spot name of a plain level
+PLATE_BYTES = 32                            # longer plates are refused at admit
+SNAPSHOT_MAGIC = b"PLSNAP04"
+PLAIN_LEVEL = 0
+COMPACT_LEVEL = 1
+
+VEHICLE_CLASSES = {VehicleType.CAR: Car, VehicleType.TRUCK: Truck, VehicleType.BIKE: Bike}
+
+def encode_plate(plate):
+  data = plate.encode()
+  if len(data) > PLATE_BYTES:
+    raise ValueError(f"license plate {plate!r} is longer than {PLATE_BYTES} bytes")
+  return data
+
+class TicketJournal:
+  def __init__(self, directory, batch_size=64, snapshot_every=10000, fsync=False):
+    os.makedirs(directory, exist_ok=True)
+    self.journal_path = os.path.join(directory, "journal.log")
+    self.snapshot_path = os.path.join(directory, "snapshot.bin")
+    self.batch_size = batch_size
+    self.snapshot_every = snapshot_every
+    self.fsync = fsync
+    self.lot = None
+    self.seq = 0
+    self.events_since_snapshot = 0
+    self.buffer = bytearray()
+    self.pending = 0
+    self.lock = Lock()
+    self.file = open(self.journal_path, "ab")
+    # drop a partial record left by a crash so new records stay aligned
+    size = os.path.getsize(self.journal_path)
+    if size % RECORD.size:
+      self.file.truncate(size - size % RECORD.size)
+
+  # 1. Writing
+  def attach(self, lot):
+    # the first snapshot captures the layout, so it is taken right away
+    lot.journal = self
+    self.lot = lot
+    self.snapshot(lot)
+
+  def check_vehicle(self, vehicle):
+    # called by ParkingLot.admit_vehicle() before a spot is taken
+    encode_plate(vehicle.license_plate)
+
+  def record_admit(self, ticket):
+    self._append(ADMIT, ticket, ticket.entry_timestamp)
+
+  def record_release(self, ticket):
+    self._append(RELEASE, ticket, ticket.exit_timestamp)
+
+  def _append(self, event, ticket, timestamp):
+    spot = ticket.spot
+    with self.lock:
+      self.seq += 1
+      self.buffer += RECORD.pack(self.seq, event, spot.level_number, spot.index,
+                                 ticket.vehicle.vehicle_type.value, timestamp, ticket.ticket_id,
+                                 encode_plate(ticket.vehicle.license_plate))
+      self.pending += 1
+      self.events_since_snapshot += 1
+      if self.pending >= self.batch_size:
+        self._flush()
+      if self.lot is not None and self.events_since_snapshot >= self.snapshot_every:
+        self._snapshot(self.lot)
+
+  def flush(self):
+    with self.lock:
+      self._flush()
+
+  def _flush(self):
+    if not self.buffer:
+      return
+    self.file.write(self.buffer)
+    self.file.flush()
+    if self.fsync:
+      os.fsync(self.file.fileno())
+    self.buffer.clear()
+    self.pending = 0
+
+  def snapshot(self, lot):
+    with self.lock:
+      self._snapshot(lot)
+
+  def _snapshot(self, lot):
+    self._flush()
+    tickets = list(lot.active_tickets.values())
+    parts = [SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, self.seq, lot.active_tickets.next_id,
+                                  len(lot.levels), len(tickets))]
+    for level in lot.levels:
+      if isinstance(level, CompactParkingLevel):
+        name = level.prefix.encode()
+        parts += [LEVEL_HEADER.pack(level.level_number, COMPACT_LEVEL, len(level.types), len(name)),
+                  name, bytes(level.types)]
+      else:
+        name = b"".join(NAME_SIZE.pack(len(encoded)) + encoded
+                        for encoded in (spot.spot_number.encode() for spot in level.spots))
+        parts += [LEVEL_HEADER.pack(level.level_number, PLAIN_LEVEL, len(level.spots), len(name)),
+                  name, bytes(spot.vehicle_type.value for spot in level.spots)]
+    for ticket in tickets:
+      spot = ticket.spot
+      parts.append(RECORD.pack(0, ADMIT, spot.level_number, spot.index,
+                               ticket.vehicle.vehicle_type.value, ticket.entry_timestamp,
+                               ticket.ticket_id,
+                               encode_plate(ticket.vehicle.license_plate)))
+    tmp_path = self.snapshot_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+      f.write(b"".join(parts))
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(tmp_path, self.snapshot_path)
+    # events up to self.seq now live in the snapshot; replay skips them even if
+    # we crash before this truncate
+    self.file.truncate(0)
+    self.events_since_snapshot = 0
+
+  def close(self):
+    with self.lock:
+      self._flush()
+      self.file.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  # 2. Recovery
+  def recover(self):
+    if not os.path.exists(self.snapshot_path):
+      return None
+    with open(self.snapshot_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+      lot, levels = self._load_snapshot(data)
+    if os.path.getsize(self.journal_path):
+      with open(self.journal_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        self._replay(lot, levels, data)
+    return lot
+
+  def _load_snapshot(self, data):
+    magic, self.seq, next_id, level_count, ticket_count = SNAPSHOT_HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC:
+      raise ValueError(f"{self.snapshot_path} is not a parking lot snapshot")
+    offset = SNAPSHOT_HEADER.size
+    lot = ParkingLot()
+    levels = {}
+    for _ in range(level_count):
+      level_number, kind, spot_count, name_size = LEVEL_HEADER.unpack_from(data, offset)
+      offset += LEVEL_HEADER.size
+      name = data[offset:offset + name_size]
+      offset += name_size
+      types = data[offset:offset + spot_count]
+      offset += spot_count
+      if kind == COMPACT_LEVEL:
+        level = CompactParkingLevel(level_number, (VEHICLE_TYPES[code] for code in types), name.decode())
+      else:
+        spot_numbers, position = [], 0
+        for _ in range(spot_count):
+          size, = NAME_SIZE.unpack_from(name, position)
+          position += NAME_SIZE.size
+          spot_numbers.append(name[position:position + size].decode())
+          position += size
+        level = ParkingLevel(level_number, [ParkingSpot(spot_number, VEHICLE_TYPES[code])
+                                            for spot_number, code in zip(spot_numbers, types)])
+      lot.add_level(level)
+      levels[level_number] = level
+    end = offset + ticket_count * RECORD.size
+    view = memoryview(data)[offset:end]
+    for record in RECORD.iter_unpack(view):
+      self._apply(lot, levels, record)
+    view.release()
+    # ids of tickets released before the snapshot are never issued again
+    lot.active_tickets.next_id = max(lot.active_tickets.next_id, next_id)
+    return lot, levels
+
+  def _replay(self, lot, levels, data):
+    # a crash can leave a partial record at the end; it is ignored
+    size = len(data) - len(data) % RECORD.size
+    view = memoryview(data)[:size]
+    for record in RECORD.iter_unpack(view):
+      if record[0] > self.seq:
+        self._apply(lot, levels, record)
+        self.seq = record[0]
+    view.release()
+
+  def _apply(self, lot, levels, record):
+    _, event, level_number, index, code, timestamp, ticket_id, plate = record
+    # replay is idempotent: a snapshot may already contain an admit (or miss a
+    # release) whose journal record was written right after it
+    if event == ADMIT:
+      if ticket_id in lot.active_tickets:
+        return
+      vehicle = VEHICLE_CLASSES[VEHICLE_TYPES[code]](plate.rstrip(b"\0").decode())
+      spot = levels[level_number].spots[index]
+      spot.park(vehicle)
+      ticket = Ticket(ticket_id, spot, vehicle)
+      ticket.entry_timestamp = timestamp
+      lot.active_tickets.restore(ticket)
+    else:
+      ticket = lot.active_tickets.pop(ticket_id, None)
+      if ticket:
+        ticket.spot.unpark()
+      lot.active_tickets.next_id = max(lot.active_tickets.next_id, ticket_id + 1)
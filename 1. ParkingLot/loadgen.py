@@ -0,0 +1,72 @@
+# Load generator for service.py -> many concurrent gate connections
+#
+# Each connection plays a gate: admit a vehicle, release it, repeat, with an
+# occasional availability query. Per-request latency is measured on the client.
+#
+#   python loadgen.py --connections 2000 --duration 10
+#   python loadgen.py --unix /tmp/parking.sock
+import argparse
+import asyncio
+import random
+import time
+
+VEHICLE_TYPES = ["CAR"] * 6 + ["BIKE"] * 3 + ["TRUCK"]
+
+async def gate(gate_id, args, deadline, latencies, errors):
+  if args.unix:
+    reader, writer = await asyncio.open_unix_connection(args.unix)
+  else:
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+  rng = random.Random(args.seed + gate_id)
+  perf_counter = time.perf_counter
+
+  async def call(request):
+    start = perf_counter()
+    writer.write(request)
+    reply = await reader.readline()
+    latencies.append(perf_counter() - start)
+    if not reply.startswith(b"OK"):
+      errors.append(reply)
+    return reply
+
+  i = 0
+  try:
+    while perf_counter() < deadline:
+      i += 1
+      if rng.random() < args.query_ratio:
+        await call(b"Q\n")
+        continue
+      reply = await call(f"A {rng.choice(VEHICLE_TYPES)} G{gate_id}-{i}\n".encode())
+      if reply.startswith(b"OK"):
+        await call(b"R " + reply.split()[1] + b"\n")
+  finally:
+    writer.close()
+
+def percentile(sorted_values, p):
+  if not sorted_values:
+    return 0.0
+  return sorted_values[min(len(sorted_values) - 1, int(p / 100.0 * len(sorted_values)))]
+
+async def main(args):
+  latencies, errors = [], []
+  deadline = time.perf_counter() + args.duration
+  start = time.perf_counter()
+  await asyncio.gather(*(gate(g, args, deadline, latencies, errors) for g in range(args.connections)))
+  elapsed = time.perf_counter() - start
+  latencies.sort()
+  print(f"connections   {args.connections}")
+  print(f"requests      {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:,.0f} req/s)")
+  print(f"errors        {len(errors)}" + (f" (first: {errors[0].decode().strip()})" if errors else ""))
+  for p in (50, 90, 99):
+    print(f"p{p:<12} {percentile(latencies, p) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="load generator for the parking gate service")
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=8600)
+  parser.add_argument("--unix")
+  parser.add_argument("--connections", type=int, default=500)
+  parser.add_argument("--duration", type=float, default=5.0)
+  parser.add_argument("--query-ratio", type=float, default=0.05)
+  parser.add_argument("--seed", type=int, default=1)
+  asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,179 @@
+# Gate service -> asyncio TCP / Unix-socket front end for one ParkingLot
+#
+# Line protocol, one request per line, one reply per line:
+#   A <CAR|TRUCK|BIKE> <plate>   -> OK <ticket_id> <level_number> <spot_number>
+#   R <ticket_id>                -> OK <fee>
+#   Q                            -> OK <level>:<CAR>,<TRUCK>,<BIKE> ...  (free spots)
+#   anything that fails          -> ERR <message>
+#
+# Connection handlers only read lines and queue them. A single batcher task
+# drains whatever has queued up (up to max_batch), so the lot is never touched
+# concurrently and a burst of gate events costs one wake-up instead of one per
+# event. Within a burst, each run of consecutive releases is applied with one
+# ParkingLot.release_vehicles() call (fees settled together); admits and
+# queries run one at a time, in arrival order. Lines longer than the stream
+# limit get an ERR and the connection is closed; stop() answers every request
+# still queued with ERR.
+#
+#   python service.py --port 8600 --levels 4 --spots 2000
+#   python service.py --unix /tmp/parking.sock
+import argparse
+import asyncio
+
+from design import (VehicleType, Car, Truck, Bike, ParkingLot, ParkingLevel, SpotFactory,
+                    VehicleBasedFeeStrategy)
+
+VEHICLE_CLASSES = {"CAR": Car, "TRUCK": Truck, "BIKE": Bike}
+
+class GateService:
+  def __init__(self, lot, max_batch=256):
+    self.lot = lot
+    self.max_batch = max_batch
+    self.queue = asyncio.Queue()
+    self.batches = 0
+    self.requests = 0
+    self._batcher = None
+    self._server = None
+    self.stopping = False
+
+  # 1. Lifecycle
+  async def start(self, host="127.0.0.1", port=8600, unix_path=None):
+    self._batcher = asyncio.create_task(self._run_batches())
+    if unix_path:
+      self._server = await asyncio.start_unix_server(self._handle, path=unix_path, backlog=4096)
+    else:
+      self._server = await asyncio.start_server(self._handle, host, port, backlog=4096)
+    return self._server
+
+  async def stop(self):
+    self.stopping = True
+    if self._server:
+      self._server.close()
+      await self._server.wait_closed()
+    if self._batcher:
+      self._batcher.cancel()
+      await asyncio.gather(self._batcher, return_exceptions=True)
+    # nobody will execute what is still queued; answer it so no handler hangs
+    while not self.queue.empty():
+      _, future = self.queue.get_nowait()
+      if not future.done():
+        future.set_result(b"ERR service stopping\n")
+
+  # 2. Connections
+  async def _handle(self, reader, writer):
+    loop = asyncio.get_running_loop()
+    try:
+      while True:
+        try:
+          line = await reader.readline()
+        except ValueError:   # longer than the stream limit; the rest of it cannot be framed
+          writer.write(b"ERR line too long\n")
+          await writer.drain()
+          break
+        if not line:
+          break
+        if self.stopping:
+          writer.write(b"ERR service stopping\n")
+          await writer.drain()
+          break
+        future = loop.create_future()
+        self.queue.put_nowait((line, future))
+        writer.write(await future)
+        await writer.drain()
+    except ConnectionError:
+      pass
+    finally:
+      writer.close()
+
+  # 3. Batching
+  async def _run_batches(self):
+    while True:
+      batch = [await self.queue.get()]
+      while len(batch) < self.max_batch and not self.queue.empty():
+        batch.append(self.queue.get_nowait())
+      self.batches += 1
+      self.requests += len(batch)
+      releases = []   # (ticket id, future) of the current run of releases
+      for line, future in batch:
+        parts = line.split()
+        if len(parts) == 2 and parts[0] == b"R":
+          releases.append((parts[1].decode(errors="replace"), future))
+          continue
+        self.release_run(releases)
+        releases = []
+        if not future.cancelled():
+          future.set_result(self.execute(line))
+      self.release_run(releases)
+
+  def release_run(self, releases):
+    if not releases:
+      return
+    try:
+      fees = self.lot.release_vehicles([ticket_id for ticket_id, _ in releases])
+    except Exception as e:
+      fees = [e] * len(releases)
+    for (_, future), fee in zip(releases, fees):
+      if future.cancelled():
+        continue
+      if fee is None:
+        future.set_result(b"ERR Invalid ticket\n")
+      elif isinstance(fee, Exception):
+        future.set_result(f"ERR {fee}\n".encode())
+      else:
+        future.set_result(f"OK {fee:.2f}\n".encode())
+
+  def execute(self, line):
+    parts = line.split()
+    try:
+      if not parts:
+        raise ValueError("empty request")
+      command = parts[0]
+      if command == b"A" and len(parts) == 3:
+        vehicle = VEHICLE_CLASSES[parts[1].decode()](parts[2].decode())
+        ticket = self.lot.admit_vehicle(vehicle)
+        return f"OK {ticket.ticket_id} {ticket.spot.level_number} {ticket.spot.spot_number}\n".encode()
+      if command == b"R" and len(parts) == 2:
+        fee = self.lot.release_vehicle(parts[1].decode())
+        return f"OK {fee:.2f}\n".encode()
+      if command == b"Q":
+        return ("OK " + " ".join(
+          f"{level.level_number}:" + ",".join(str(level.free_count(vehicle_type)) for vehicle_type in VehicleType)
+          for level in self.lot.levels) + "\n").encode()
+      raise ValueError(f"bad request {line.strip().decode(errors='replace')!r}")
+    except KeyError as e:
+      return f"ERR unknown vehicle type {e}\n".encode()
+    except Exception as e:
+      return f"ERR {e}\n".encode()
+
+def build_lot(levels, spots_per_level):
+  lot = ParkingLot()
+  lot.set_fee_strategy(VehicleBasedFeeStrategy())
+  mix = [VehicleType.CAR] * 6 + [VehicleType.BIKE] * 3 + [VehicleType.TRUCK]
+  for level_number in range(1, levels + 1):
+    factory = SpotFactory(f"L{level_number}-")
+    lot.add_level(ParkingLevel(level_number, [factory.make_spot(mix[i % len(mix)])
+                                              for i in range(spots_per_level)]))
+  return lot
+
+async def serve(args):
+  service = GateService(build_lot(args.levels, args.spots), args.max_batch)
+  server = await service.start(args.host, args.port, args.unix)
+  print(f"Gate service listening on {args.unix or f'{args.host}:{args.port}'}")
+  async with server:
+    try:
+      await server.serve_forever()
+    finally:
+      print(f"{service.requests} requests in {service.batches} batches")
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="asyncio gate service for a ParkingLot")
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=8600)
+  parser.add_argument("--unix", help="listen on a Unix socket instead of TCP")
+  parser.add_argument("--levels", type=int, default=4)
+  parser.add_argument("--spots", type=int, default=2000, help="spots per level")
+  parser.add_argument("--max-batch", type=int, default=256)
+  try:
+    asyncio.run(serve(parser.parse_args()))
+  except KeyboardInterrupt:
+    pass
@@ -0,0 +1,254 @@
+# AI player -> negamax with alpha-beta pruning for any n x n board
+#
+# Search runs on two bitboards (side to move, other side) with the line masks
+# from BitBoard. It uses:
+#   - iterative deepening under a time budget (the last completed depth wins)
+#   - move ordering: transposition-table move, then history heuristic, then centre
+#   - a transposition table keyed by Zobrist hashes, bounded in size with
+#     oldest-first eviction
+#   - board symmetries: 8 Zobrist hashes (one per rotation/reflection) are
+#     updated together and the smallest one is the key, so symmetric positions
+#     share one entry
+# 3x3 is solved completely in milliseconds; 4x4 and 5x5 return the best move
+# of the deepest search that fits in time_budget.
+import random
+import time
+from collections import OrderedDict
+
+from design import Player, BitBoard
+
+WIN = 1_000_000
+WIN_BOUND = WIN - 10_000   # scores beyond this are forced wins/losses
+EXACT, LOWER, UPPER = 0, 1, 2
+LINE_WEIGHTS = [0, 1, 10, 100, 1000, 10000, 100000, 100000, 100000]
+
+class SearchTimeout(Exception):
+  pass
+
+def symmetries(n):
+  # the 8 rotations/reflections of the square as cell permutations
+  maps = [lambda x, y: (x, y), lambda x, y: (y, x),
+          lambda x, y: (n - 1 - x, y), lambda x, y: (x, n - 1 - y),
+          lambda x, y: (n - 1 - x, n - 1 - y), lambda x, y: (y, n - 1 - x),
+          lambda x, y: (n - 1 - y, x), lambda x, y: (n - 1 - y, n - 1 - x)]
+  perms = []
+  for transform in maps:
+    perm = [0] * (n * n)
+    for x in range(n):
+      for y in range(n):
+        tx, ty = transform(x, y)
+        perm[x * n + y] = tx * n + ty
+    perms.append(perm)
+  inverses = []
+  for perm in perms:
+    inverse = [0] * (n * n)
+    for cell, target in enumerate(perm):
+      inverse[target] = cell
+    inverses.append(inverse)
+  return perms, inverses
+
+class TranspositionTable:
+  def __init__(self, max_entries=1_000_000):
+    self.max_entries = max_entries
+    self.entries = OrderedDict()
+
+  def get(self, key):
+    return self.entries.get(key)
+
+  def put(self, key, entry):
+    entries = self.entries
+    if key in entries:
+      entries[key] = entry
+      return
+    if len(entries) >= self.max_entries:
+      entries.popitem(last=False)
+    entries[key] = entry
+
+  def __len__(self):
+    return len(self.entries)
+
+class AlphaBetaSearch:
+  def __init__(self, n, tt_size=1_000_000, seed=0):
+    self.n = n
+    self.cells = n * n
+    self.full = (1 << self.cells) - 1
+    self.lines, masks_through = BitBoard.line_masks(n)
+    self.lines_through = masks_through
+    self.perms, self.inverses = symmetries(n)
+    rng = random.Random(seed)
+    base = [[rng.getrandbits(64) for _ in range(self.cells)] for _ in range(2)]
+    # zobrist[side][cell] holds one key per symmetry: the key of the cell it maps to
+    self.zobrist = [[tuple(base[side][perm[cell]] for perm in self.perms) for cell in range(self.cells)]
+                    for side in range(2)]
+    self.side_key = rng.getrandbits(64)
+    self.table = TranspositionTable(tt_size)
+    center = (n - 1) / 2.0
+    self.center_order = sorted(range(self.cells),
+                               key=lambda c: abs(c // n - center) + abs(c % n - center))
+    self.history = [0] * self.cells
+    self.nodes = 0
+    self.deadline = float("inf")
+
+  # 1. Entry point
+  def best_move(self, me, opp, time_budget=1.0, max_depth=None):
+    start = time.perf_counter()
+    self.deadline = start + time_budget
+    self.nodes = 0
+    self.history = [0] * self.cells
+    empty = self.cells - bin(me | opp).count("1")
+    max_depth = min(max_depth or empty, empty)
+    hashes = self.hash(me, opp)
+    best, score, depth_done = None, 0, 0
+    for depth in range(1, max_depth + 1):
+      try:
+        move, value = self.search_root(me, opp, hashes, depth, best)
+      except SearchTimeout:
+        break
+      best, score, depth_done = move, value, depth
+      if abs(value) >= WIN_BOUND:
+        break  # forced result, deeper search cannot change it
+    if best is None:  # not even depth 1 finished
+      best = next(c for c in self.center_order if not (me | opp) >> c & 1)
+    self.last_stats = {"depth": depth_done, "score": score, "nodes": self.nodes,
+                       "seconds": time.perf_counter() - start, "tt_entries": len(self.table)}
+    return best, score
+
+  def hash(self, me, opp):
+    hashes = [0] * 8
+    for side, bits in ((0, me), (1, opp)):
+      for cell in range(self.cells):
+        if bits >> cell & 1:
+          keys = self.zobrist[side][cell]
+          for s in range(8):
+            hashes[s] ^= keys[s]
+    return tuple(hashes)
+
+  def search_root(self, me, opp, hashes, depth, previous_best):
+    alpha, beta = -WIN - 1, WIN + 1
+    best, best_value = None, -WIN - 1
+    for cell in self.order_moves(me | opp, previous_best):
+      value = self.play(me, opp, 0, hashes, cell, depth, alpha, beta, 0)
+      if value > best_value:
+        best, best_value = cell, value
+      alpha = max(alpha, value)
+    return best, best_value
+
+  # 2. Negamax
+  def play(self, me, opp, side, hashes, cell, depth, alpha, beta, ply):
+    # value of playing cell for the side to move
+    new_me = me | (1 << cell)
+    for mask in self.lines_through[cell]:
+      if new_me & mask == mask:
+        return WIN - (ply + 1)
+    keys = self.zobrist[side][cell]
+    child = tuple(h ^ k for h, k in zip(hashes, keys))
+    return -self.negamax(opp, new_me, 1 - side, child, depth - 1, -beta, -alpha, ply + 1)
+
+  def negamax(self, me, opp, side, hashes, depth, alpha, beta, ply):
+    self.nodes += 1
+    if self.nodes & 1023 == 0 and time.perf_counter() > self.deadline:
+      raise SearchTimeout()
+    occupied = me | opp
+    if occupied == self.full:
+      return 0
+    if depth == 0:
+      return self.evaluate(me, opp)
+
+    key, sym = min((h ^ (self.side_key if side else 0), s) for s, h in enumerate(hashes))
+    entry = self.table.get(key)
+    tt_move = None
+    if entry:
+      entry_depth, stored, flag, move = entry
+      tt_move = self.inverses[sym][move]
+      value = stored - ply if stored > WIN_BOUND else stored + ply if stored < -WIN_BOUND else stored
+      if entry_depth >= depth:
+        if flag == EXACT:
+          return value
+        if flag == LOWER and value > alpha:
+          alpha = value
+        elif flag == UPPER and value < beta:
+          beta = value
+        if alpha >= beta:
+          return value
+
+    alpha_start = alpha
+    best_value, best_move = -WIN - 1, None
+    for cell in self.order_moves(occupied, tt_move):
+      value = self.play(me, opp, side, hashes, cell, depth, alpha, beta, ply)
+      if value > best_value:
+        best_value, best_move = value, cell
+        if value > alpha:
+          alpha = value
+          if alpha >= beta:
+            self.history[cell] += depth * depth
+            break
+
+    flag = UPPER if best_value <= alpha_start else LOWER if best_value >= beta else EXACT
+    stored = (best_value + ply if best_value > WIN_BOUND
+              else best_value - ply if best_value < -WIN_BOUND else best_value)
+    self.table.put(key, (depth, stored, flag, self.perms[sym][best_move]))
+    return best_value
+
+  def order_moves(self, occupied, first=None):
+    moves = [cell for cell in self.center_order if not occupied >> cell & 1]
+    history = self.history
+    moves.sort(key=lambda cell: -history[cell])  # stable: centre order breaks ties
+    if first is not None and first in moves:
+      moves.remove(first)
+      moves.insert(0, first)
+    return moves
+
+  def evaluate(self, me, opp):
+    # open lines only: lines holding marks of both sides can no longer be won
+    score = 0
+    for mask in self.lines:
+      mine, theirs = me & mask, opp & mask
+      if mine and not theirs:
+        score += LINE_WEIGHTS[min(mine.bit_count(), len(LINE_WEIGHTS) - 1)]
+      elif theirs and not mine:
+        score -= LINE_WEIGHTS[min(theirs.bit_count(), len(LINE_WEIGHTS) - 1)]
+    return score
+
+def board_bits(board, mark):
+  # (cells of mark, cells of everyone else) as bitboards, for any board backend
+  if isinstance(board, BitBoard):
+    me = board.bits.get(mark, 0)
+    return me, board.occupied & ~me
+  n = board.n
+  me = opp = 0
+  for x in range(n):
+    for y in range(n):
+      value = board.cell(x, y)
+      if value == mark:
+        me |= 1 << (x * n + y)
+      elif value != ".":
+        opp |= 1 << (x * n + y)
+  return me, opp
+
+class AIPlayer(Player):
+  def __init__(self, name, piece, time_budget=1.0, max_depth=None, tt_size=1_000_000, seed=0):
+    super().__init__(name, piece)
+    self.time_budget = time_budget
+    self.max_depth = max_depth
+    self.tt_size = tt_size
+    self.seed = seed
+    self.search = None
+    self.last_stats = None
+
+  def get_move(self, board):
+    n = board.n
+    if self.search is None or self.search.n != n:
+      self.search = AlphaBetaSearch(n, self.tt_size, self.seed)
+    me, opp = board_bits(board, self.piece.mark.name)
+    cell, _ = self.search.best_move(me, opp, self.time_budget, self.max_depth)
+    self.last_stats = self.search.last_stats
+    print(f"{self.name} plays {cell // n}{cell % n}")
+    return (cell // n, cell % n)
+
+if __name__ == "__main__":
+  from design import PieceTypeX, PieceTypeO, Game, make_board, get_board_size
+  human = Player("Player1", PieceTypeX())
+  computer = AIPlayer("Computer", PieceTypeO())
+  game = Game(make_board(get_board_size()), human, computer)
+  print("Results: ")
+  game.play()
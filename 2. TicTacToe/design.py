@@ -1,3 +1,4 @@
+from abc import ABC, abstractmethod
 from enum import Enum
 
 class Piece(Enum):
@@ -23,11 +24,29 @@ class Player:
     self.name = name
     self.piece = piece
 
+  def get_move(self, board):
+    return input('Enter the position: ')
+
+# Move policy -> headless strategy for picking a move (selfplay.py, mcts.py)
+class MovePolicy(ABC):
+  @abstractmethod
+  def choose(self, board, player, rng):
+    """Return the (x, y) cell the player should mark."""
+    pass
+
 class Board:
+  # Besides the grid, every player has a counter per row, per column and for
+  # both diagonals. mark() bumps the counters of the cell's lines, so the move
+  # that completes a line is spotted in O(1) and has_winner() is a field read.
   def __init__(self, n):
     self.n = n
     self.board = [["."] * n for i in range(n)]
     self.spots_filled = 0
+    self.row_counts = {}
+    self.col_counts = {}
+    self.diagonal_counts = {}
+    self.anti_diagonal_counts = {}
+    self.winner = None
   
   def mark(self, position, current_player):
     x = int(position[0])
@@ -35,44 +54,298 @@ class Board:
 
     spot = self.board[x][y]
     if spot == ".":
-      self.board[x][y] = current_player.piece.mark.name
+      mark = current_player.piece.mark.name
+      self.board[x][y] = mark
       self.spots_filled += 1
+      self.update_counts(x, y, mark)
     else:
       raise Exception(f"Spot is already marked by {self.board[x][y]}")
+
+  def update_counts(self, x, y, mark):
+    n = self.n
+    if mark not in self.row_counts:
+      self.row_counts[mark] = [0] * n
+      self.col_counts[mark] = [0] * n
+      self.diagonal_counts[mark] = 0
+      self.anti_diagonal_counts[mark] = 0
+    rows = self.row_counts[mark]
+    cols = self.col_counts[mark]
+    rows[x] += 1
+    cols[y] += 1
+    won = rows[x] == n or cols[y] == n
+    if x == y:
+      self.diagonal_counts[mark] += 1
+      won = won or self.diagonal_counts[mark] == n
+    if x + y == n - 1:
+      self.anti_diagonal_counts[mark] += 1
+      won = won or self.anti_diagonal_counts[mark] == n
+    if won and self.winner is None:
+      self.winner = mark
   
   def get_board(self):
     for row in self.board:
       print("|".join(row))
 
+  def cell(self, x, y):
+    return self.board[x][y]
+
   def is_full(self):
     return self.spots_filled == self.n * self.n
   
   def has_winner(self) -> bool:
-    # 1) Check each row
-    for i in range(self.n):
-        mark = self.board[i][0]
-        if mark != "." and all(self.board[i][j] == mark for j in range(self.n)):
-            return True
-
-    # 2) Check each column
-    for j in range(self.n):
-        mark = self.board[0][j]
-        if mark != "." and all(self.board[i][j] == mark for i in range(self.n)):
-            return True
-
-    # 3) Check main diagonal
-    mark = self.board[0][0]
-    if mark != "." and all(self.board[i][i] == mark for i in range(self.n)):
-        return True
-
-    # 4) Check anti-diagonal
-    mark = self.board[0][self.n - 1]
-    if mark != "." and all(self.board[i][self.n - 1 - i] == mark for i in range(self.n)):
-        return True
-
-    return False
+    return self.winner is not None
      
 
+# Fast board backends -> BitBoard (small n), ArrayBoard (large n) and
+# SparseBoard (k in a row, large or unbounded boards)
+# Same mark()/is_full()/has_winner()/get_board() interface as Board, plus
+# copy(), undo() and key() for simulations and search. Each board keeps the
+# move history, so undo() restores the previous position in O(1).
+BITBOARD_MAX_N = 8   # n * n cells still fit in one 64-bit word
+MARK_CODES = {piece.name: code for code, piece in enumerate(Piece, start=1)}
+CODE_MARKS = ["."] + [piece.name for piece in Piece]
+
+class FastBoard:
+  def __init__(self, n):
+    self.n = n
+    self.spots_filled = 0
+    self.winner = None
+    self.history = []
+
+  def is_full(self):
+    return self.spots_filled == self.n * self.n
+
+  def has_winner(self) -> bool:
+    return self.winner is not None
+
+  def get_board(self):
+    for x in range(self.n):
+      print("|".join(self.cell(x, y) for y in range(self.n)))
+
+  def empty_cells(self):
+    return [(x, y) for x in range(self.n) for y in range(self.n) if self.cell(x, y) == "."]
+
+class BitBoard(FastBoard):
+  # one int per mark with bit x * n + y set for every marked cell; a line is
+  # complete when (bits & mask) == mask
+  _masks = {}
+
+  def __init__(self, n):
+    super().__init__(n)
+    self.bits = {}
+    self.occupied = 0
+    self.lines, self.lines_through = BitBoard.line_masks(n)
+
+  @staticmethod
+  def line_masks(n):
+    if n not in BitBoard._masks:
+      rows = [sum(1 << (x * n + y) for y in range(n)) for x in range(n)]
+      cols = [sum(1 << (x * n + y) for x in range(n)) for y in range(n)]
+      diagonal = sum(1 << (i * n + i) for i in range(n))
+      anti_diagonal = sum(1 << (i * n + n - 1 - i) for i in range(n))
+      lines = rows + cols + [diagonal, anti_diagonal]
+      lines_through = [[mask for mask in lines if mask >> cell & 1] for cell in range(n * n)]
+      BitBoard._masks[n] = (lines, lines_through)
+    return BitBoard._masks[n]
+
+  def mark(self, position, current_player):
+    x = int(position[0])
+    y = int(position[1])
+    cell = x * self.n + y
+    bit = 1 << cell
+    if self.occupied & bit:
+      raise Exception(f"Spot is already marked by {self.cell(x, y)}")
+    mark = current_player.piece.mark.name
+    bits = self.bits.get(mark, 0) | bit
+    self.bits[mark] = bits
+    self.occupied |= bit
+    self.spots_filled += 1
+    self.history.append((cell, mark, self.winner))
+    if self.winner is None:
+      for mask in self.lines_through[cell]:
+        if bits & mask == mask:
+          self.winner = mark
+          break
+
+  def undo(self):
+    cell, mark, winner = self.history.pop()
+    bit = 1 << cell
+    self.bits[mark] ^= bit
+    self.occupied ^= bit
+    self.spots_filled -= 1
+    self.winner = winner
+
+  def cell(self, x, y):
+    bit = 1 << (x * self.n + y)
+    if self.occupied & bit:
+      for mark, bits in self.bits.items():
+        if bits & bit:
+          return mark
+    return "."
+
+  def winning_marks(self):
+    # full scan of every line at once, independent of the move history
+    return {mark for mark, bits in self.bits.items()
+            if any(bits & mask == mask for mask in self.lines)}
+
+  def copy(self):
+    board = BitBoard.__new__(BitBoard)
+    board.__dict__.update(self.__dict__)
+    board.bits = dict(self.bits)
+    board.history = list(self.history)
+    return board
+
+  def key(self):
+    return (self.n,) + tuple(sorted((mark, bits) for mark, bits in self.bits.items() if bits))
+
+class ArrayBoard(FastBoard):
+  # cells in one bytearray (0 = empty, otherwise MARK_CODES[mark]); rows,
+  # columns and diagonals are strided slices, so line checks run in C
+  def __init__(self, n):
+    super().__init__(n)
+    self.cells = bytearray(n * n)
+
+  def mark(self, position, current_player):
+    x = int(position[0])
+    y = int(position[1])
+    n = self.n
+    cell = x * n + y
+    if self.cells[cell]:
+      raise Exception(f"Spot is already marked by {self.cell(x, y)}")
+    mark = current_player.piece.mark.name
+    code = MARK_CODES[mark]
+    cells = self.cells
+    cells[cell] = code
+    self.spots_filled += 1
+    self.history.append((cell, self.winner))
+    if self.winner is None and (
+        cells[x * n:(x + 1) * n].count(code) == n
+        or cells[y::n].count(code) == n
+        or (x == y and cells[::n + 1].count(code) == n)
+        or (x + y == n - 1 and cells[n - 1:n * n - 1:n - 1].count(code) == n)):
+      self.winner = mark
+
+  def undo(self):
+    cell, winner = self.history.pop()
+    self.cells[cell] = 0
+    self.spots_filled -= 1
+    self.winner = winner
+
+  def cell(self, x, y):
+    return CODE_MARKS[self.cells[x * self.n + y]]
+
+  def empty_cells(self):
+    n = self.n
+    return [divmod(cell, n) for cell, code in enumerate(self.cells) if not code]
+
+  def copy(self):
+    board = ArrayBoard.__new__(ArrayBoard)
+    board.__dict__.update(self.__dict__)
+    board.cells = bytearray(self.cells)
+    board.history = list(self.history)
+    return board
+
+  def key(self):
+    return (self.n, bytes(self.cells))
+
+class SparseBoard(FastBoard):
+  # k in a row on an n x n board (n=None: unbounded); only occupied cells are
+  # stored, so memory follows the number of moves rather than n * n. A move
+  # can only complete lines through its own cell, so mark() walks the four
+  # directions from it, at most k - 1 cells each way.
+  DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+  def __init__(self, n=None, k=5):
+    super().__init__(n)
+    self.k = k
+    self.cells = {}
+    self.reach = 1   # empty_cells() offers cells at most this far from a mark
+
+  def mark(self, position, current_player):
+    x = int(position[0])
+    y = int(position[1])
+    n = self.n
+    if n is not None and not (0 <= x < n and 0 <= y < n):
+      raise Exception("Incorrect position, try again")
+    cells = self.cells
+    if (x, y) in cells:
+      raise Exception(f"Spot is already marked by {cells[(x, y)]}")
+    mark = current_player.piece.mark.name
+    cells[(x, y)] = mark
+    self.spots_filled += 1
+    self.history.append(((x, y), self.winner))
+    if self.winner is None:
+      k = self.k
+      for dx, dy in SparseBoard.DIRECTIONS:
+        count = 1
+        for sign in (1, -1):
+          cx, cy = x + sign * dx, y + sign * dy
+          while count < k and cells.get((cx, cy)) == mark:
+            count += 1
+            cx += sign * dx
+            cy += sign * dy
+        if count >= k:
+          self.winner = mark
+          break
+
+  def undo(self):
+    position, winner = self.history.pop()
+    del self.cells[position]
+    self.spots_filled -= 1
+    self.winner = winner
+
+  def cell(self, x, y):
+    return self.cells.get((x, y), ".")
+
+  def is_full(self):
+    return self.n is not None and self.spots_filled == self.n * self.n
+
+  def bounds(self):
+    if self.n is not None:
+      return 0, self.n - 1, 0, self.n - 1
+    if not self.cells:
+      return 0, 0, 0, 0
+    xs = [x for x, _ in self.cells]
+    ys = [y for _, y in self.cells]
+    return min(xs), max(xs), min(ys), max(ys)
+
+  def get_board(self):
+    x0, x1, y0, y1 = self.bounds()
+    for x in range(x0, x1 + 1):
+      print("|".join(self.cell(x, y) for y in range(y0, y1 + 1)))
+
+  def empty_cells(self):
+    # candidate moves: free cells near existing marks (the centre on an empty board)
+    n = self.n
+    if not self.cells:
+      return [(n // 2, n // 2)] if n is not None else [(0, 0)]
+    reach = self.reach
+    candidates = set()
+    for x, y in self.cells:
+      for cx in range(x - reach, x + reach + 1):
+        for cy in range(y - reach, y + reach + 1):
+          if n is None or (0 <= cx < n and 0 <= cy < n):
+            candidates.add((cx, cy))
+    return sorted(candidates.difference(self.cells))
+
+  def copy(self):
+    board = SparseBoard.__new__(SparseBoard)
+    board.__dict__.update(self.__dict__)
+    board.cells = dict(self.cells)
+    board.history = list(self.history)
+    return board
+
+  def key(self):
+    return (self.n, self.k, frozenset(self.cells.items()))
+
+def make_board(n, k=None):
+  # k in a row shorter than the side (or an unbounded board) needs SparseBoard
+  if k is not None and (k < 1 or (n is not None and k > n)):
+    raise ValueError(f"cannot get {k} in a row on a {n}x{n} board")
+  if n is None or (k is not None and k < n):
+    return SparseBoard(n, k or 5)
+  return BitBoard(n) if n <= BITBOARD_MAX_N else ArrayBoard(n)
+
 class Game:
   def __init__(self, board, player1, player2):
     self.board = board
@@ -84,7 +357,7 @@ class Game:
     self.board.get_board()
     while not self.board.is_full() and not self.board.has_winner():
       print(f"Current Player: {self.current_player.name}")
-      position = input('Enter the position: ')
+      position = self.current_player.get_move(self.board)
       try:
         self.validate_input(position)
         self.board.mark(position, self.current_player)
@@ -135,7 +408,7 @@ class TicTacToe:
     player2 = Player("Player2", piece_o)
 
     board_number = get_board_size()
-    board = Board(board_number)
+    board = make_board(board_number)
     game = Game(board, player1, player2)
     print("Results: ")
     game.play()
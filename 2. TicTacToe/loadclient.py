@@ -0,0 +1,93 @@
+# Load client for server.py -> many concurrent games played by random movers
+#
+# Every connection joins a game, plays random free cells when it is its turn
+# and joins again after END until the duration is over. Move latency is the
+# time from sending MOVE to receiving the server's MOVED echo.
+#
+#   python loadclient.py --players 4000 --duration 10 --n 3
+import argparse
+import asyncio
+import random
+import time
+
+async def wait_for_start(reader):
+  # a move sent after the opponent's winning move is answered with "ERR no game"
+  while True:
+    reply = (await reader.readline()).split()
+    if reply[:3] != [b"ERR", b"no", b"game"]:
+      return reply
+
+async def player(player_id, args, deadline, latencies, counters):
+  reader, writer = await asyncio.open_connection(args.host, args.port)
+  rng = random.Random(args.seed + player_id)
+  perf_counter = time.perf_counter
+  try:
+    while perf_counter() < deadline:
+      writer.write(f"JOIN {args.n}\n".encode())
+      try:
+        # near the deadline there may be nobody left to match with
+        reply = await asyncio.wait_for(wait_for_start(reader), max(0.0, deadline - perf_counter()) + 1.0)
+      except asyncio.TimeoutError:
+        break
+      if not reply or reply[0] != b"START":
+        counters["errors"] += 1
+        break
+      mark, n = reply[2], int(reply[3])
+      free = {f"{x}{y}" for x in range(n) for y in range(n)}
+      sent = None
+      if mark == b"X":
+        cell = rng.choice(sorted(free))
+        sent = perf_counter()
+        writer.write(f"MOVE {cell}\n".encode())
+      while True:
+        reply = (await reader.readline()).split()
+        if not reply:
+          return
+        if reply[0] == b"END":
+          counters["games"] += 1
+          break
+        if reply[0] == b"ERR":
+          counters["errors"] += 1
+          continue
+        # MOVED <mark> <xy>
+        free.discard(reply[2].decode())
+        if reply[1] == mark:
+          latencies.append(perf_counter() - sent)
+          counters["moves"] += 1
+          continue
+        if free:
+          cell = rng.choice(sorted(free))
+          sent = perf_counter()
+          writer.write(f"MOVE {cell}\n".encode())
+  finally:
+    writer.close()
+
+def percentile(sorted_values, p):
+  if not sorted_values:
+    return 0.0
+  return sorted_values[min(len(sorted_values) - 1, int(p / 100.0 * len(sorted_values)))]
+
+async def main(args):
+  latencies = []
+  counters = {"moves": 0, "games": 0, "errors": 0}
+  deadline = time.perf_counter() + args.duration
+  start = time.perf_counter()
+  await asyncio.gather(*(player(p, args, deadline, latencies, counters) for p in range(args.players)))
+  elapsed = time.perf_counter() - start
+  latencies.sort()
+  print(f"players       {args.players} ({args.players // 2} concurrent games of {args.n}x{args.n})")
+  print(f"moves         {counters['moves']} in {elapsed:.2f}s ({counters['moves'] / elapsed:,.0f} moves/s)")
+  print(f"games         {counters['games'] // 2} finished")
+  print(f"errors        {counters['errors']}")
+  for p in (50, 90, 99):
+    print(f"p{p:<12} {percentile(latencies, p) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="load client for the TicTacToe game server")
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=8700)
+  parser.add_argument("--players", type=int, default=1000, help="connections; two per game")
+  parser.add_argument("--duration", type=float, default=5.0)
+  parser.add_argument("--n", type=int, default=3, help="board size")
+  parser.add_argument("--seed", type=int, default=1)
+  asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,267 @@
+# MCTS player -> Monte Carlo tree search for boards too big to search exhaustively
+#
+# Each iteration selects a leaf with UCT, expands one untried move and runs a
+# batch of random rollouts from it (rollouts_per_leaf), backing up the summed
+# result once. Positions are two bitboards, so a rollout is a shuffle plus a
+# few mask checks per move.
+#
+# workers == 1: one tree that is kept between moves; the next search starts
+# from the node of the position the opponent left us in (tree reuse).
+# workers > 1: root parallelism; every worker process grows its own tree from
+# the current position for the time budget and the root visit counts are summed.
+#
+# Every search fills an MCTSStats object (player.stats) for tuning.
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from design import Player, MovePolicy, BitBoard
+from ai import board_bits
+
+DRAW = -1
+
+class MCTSStats:
+  def __init__(self):
+    self.iterations = 0
+    self.rollouts = 0
+    self.seconds = 0.0
+    self.tree_size = 0
+    self.reused_visits = 0
+    self.workers = 1
+    self.best_move = None
+    self.best_visits = 0
+    self.best_value = 0.0
+
+  @property
+  def rollouts_per_sec(self):
+    return self.rollouts / self.seconds if self.seconds else 0.0
+
+  def as_dict(self):
+    return {"iterations": self.iterations, "rollouts": self.rollouts, "seconds": self.seconds,
+            "rollouts_per_sec": self.rollouts_per_sec, "tree_size": self.tree_size,
+            "reused_visits": self.reused_visits, "workers": self.workers,
+            "best_move": self.best_move, "best_visits": self.best_visits,
+            "best_value": self.best_value}
+
+class MCTSNode:
+  __slots__ = ("move", "parent", "children", "untried", "visits", "wins", "bits", "to_move", "result")
+
+  def __init__(self, move, parent, bits, to_move, result, cells):
+    self.move = move
+    self.parent = parent
+    self.children = {}
+    self.bits = bits
+    self.to_move = to_move
+    self.result = result      # None while the game goes on, else winning side or DRAW
+    occupied = bits[0] | bits[1]
+    self.untried = [] if result is not None else [c for c in range(cells) if not occupied >> c & 1]
+    self.visits = 0
+    self.wins = 0.0           # from the point of view of the side that played move
+
+class MCTS:
+  def __init__(self, n, exploration=1.4, rollouts_per_leaf=8, seed=None):
+    self.n = n
+    self.cells = n * n
+    self.lines_through = BitBoard.line_masks(n)[1]
+    self.exploration = exploration
+    self.rollouts_per_leaf = rollouts_per_leaf
+    self.rng = random.Random(seed)
+    self.root = None
+
+  def new_root(self, bits, to_move):
+    return MCTSNode(None, None, bits, to_move, None, self.cells)
+
+  # 1. Tree reuse
+  def set_position(self, bits, to_move):
+    # keep the subtree for this position if it is at most two plies below the old root
+    node = self.root
+    if node is not None:
+      for candidates in (node.children.values(),
+                         (grandchild for child in node.children.values()
+                          for grandchild in child.children.values())):
+        for candidate in candidates:
+          if candidate.bits == bits and candidate.to_move == to_move:
+            candidate.parent = None
+            candidate.move = None
+            self.root = candidate
+            return candidate.visits
+    self.root = self.new_root(bits, to_move)
+    return 0
+
+  # 2. Search
+  def search(self, seconds, max_iterations=None):
+    deadline = time.perf_counter() + seconds
+    iterations = rollouts = 0
+    while time.perf_counter() < deadline and (max_iterations is None or iterations < max_iterations):
+      for _ in range(16):
+        rollouts += self.iterate()
+        iterations += 1
+    return iterations, rollouts
+
+  def iterate(self):
+    node = self.root
+    log = math.log
+    sqrt = math.sqrt
+    c = self.exploration
+    while not node.untried and node.children:
+      parent_log = log(node.visits)
+      best, best_score = None, -1.0
+      for child in node.children.values():
+        score = child.wins / child.visits + c * sqrt(parent_log / child.visits)
+        if score > best_score:
+          best, best_score = child, score
+      node = best
+    if node.untried:
+      move = node.untried.pop(self.rng.randrange(len(node.untried)))
+      node = self.expand(node, move)
+
+    # a finished game needs no playout; its result is backed up batch times
+    batch = self.rollouts_per_leaf
+    if node.result is not None:
+      outcomes = [node.result] * batch
+      played = 0
+    else:
+      outcomes = [self.rollout(node.bits, node.to_move) for _ in range(batch)]
+      played = batch
+    wins = [outcomes.count(0), outcomes.count(1)]
+    draws = batch - wins[0] - wins[1]
+    while node is not None:
+      mover = 1 - node.to_move
+      node.visits += batch
+      node.wins += wins[mover] + 0.5 * draws
+      node = node.parent
+    return played
+
+  def expand(self, node, move):
+    side = node.to_move
+    bits = list(node.bits)
+    bits[side] |= 1 << move
+    mine = bits[side]
+    result = None
+    for mask in self.lines_through[move]:
+      if mine & mask == mask:
+        result = side
+        break
+    if result is None and (bits[0] | bits[1]).bit_count() == self.cells:
+      result = DRAW
+    child = MCTSNode(move, node, tuple(bits), 1 - side, result, self.cells)
+    node.children[move] = child
+    return child
+
+  def rollout(self, bits, side):
+    occupied = bits[0] | bits[1]
+    empties = [c for c in range(self.cells) if not occupied >> c & 1]
+    self.rng.shuffle(empties)
+    current = list(bits)
+    lines_through = self.lines_through
+    for cell in empties:
+      mine = current[side] | (1 << cell)
+      current[side] = mine
+      for mask in lines_through[cell]:
+        if mine & mask == mask:
+          return side
+      side = 1 - side
+    return DRAW
+
+  def root_counts(self):
+    return {move: (child.visits, child.wins) for move, child in self.root.children.items()}
+
+  def tree_size(self):
+    size, stack = 0, [self.root]
+    while stack:
+      node = stack.pop()
+      size += 1
+      stack.extend(node.children.values())
+    return size
+
+def search_worker(n, bits, to_move, seconds, exploration, rollouts_per_leaf, seed):
+  tree = MCTS(n, exploration, rollouts_per_leaf, seed)
+  tree.root = tree.new_root(bits, to_move)
+  iterations, rollouts = tree.search(seconds)
+  return tree.root_counts(), iterations, rollouts
+
+class MCTSPlayer(Player):
+  def __init__(self, name, piece, time_budget=1.0, exploration=1.4, rollouts_per_leaf=8,
+               workers=1, seed=None, verbose=True):
+    super().__init__(name, piece)
+    self.time_budget = time_budget
+    self.exploration = exploration
+    self.rollouts_per_leaf = rollouts_per_leaf
+    self.workers = workers
+    self.rng = random.Random(seed)
+    self.verbose = verbose
+    self.tree = None
+    self.pool = None
+    self.stats = MCTSStats()
+
+  def choose(self, board):
+    n = board.n
+    mark = self.piece.mark.name
+    me, opp = board_bits(board, mark)
+    bits = (me, opp)  # side 0 is always this player, and it is our turn
+    stats = MCTSStats()
+    stats.workers = self.workers
+    start = time.perf_counter()
+    if self.workers > 1:
+      if self.pool is None:
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+      futures = [self.pool.submit(search_worker, n, bits, 0, self.time_budget, self.exploration,
+                                  self.rollouts_per_leaf, self.rng.getrandbits(32))
+                 for _ in range(self.workers)]
+      counts = {}
+      for future in futures:
+        root_counts, iterations, rollouts = future.result()
+        stats.iterations += iterations
+        stats.rollouts += rollouts
+        for move, (visits, wins) in root_counts.items():
+          total = counts.get(move, (0, 0.0))
+          counts[move] = (total[0] + visits, total[1] + wins)
+    else:
+      if self.tree is None or self.tree.n != n:
+        self.tree = MCTS(n, self.exploration, self.rollouts_per_leaf, self.rng.getrandbits(32))
+      stats.reused_visits = self.tree.set_position(bits, 0)
+      stats.iterations, stats.rollouts = self.tree.search(self.time_budget)
+      counts = self.tree.root_counts()
+      stats.tree_size = self.tree.tree_size()
+    stats.seconds = time.perf_counter() - start
+    move = max(counts, key=lambda m: counts[m][0])
+    visits, wins = counts[move]
+    stats.best_move, stats.best_visits = divmod(move, n), visits
+    stats.best_value = wins / visits if visits else 0.0
+    self.stats = stats
+    return stats.best_move
+
+  def get_move(self, board):
+    x, y = self.choose(board)
+    if self.verbose:
+      print(f"{self.name} plays {x}{y} ({self.stats.rollouts} rollouts, "
+            f"{self.stats.rollouts_per_sec:,.0f}/s, value {self.stats.best_value:.2f})")
+    return (x, y)
+
+  def close(self):
+    if self.pool is not None:
+      self.pool.shutdown()
+      self.pool = None
+
+class MCTSPolicy(MovePolicy):
+  # selfplay.py adapter: one MCTSPlayer per mark
+  def __init__(self, time_budget=0.1, workers=1):
+    self.time_budget = time_budget
+    self.workers = workers
+    self.players = {}
+
+  def choose(self, board, player, rng):
+    mark = player.piece.mark.name
+    if mark not in self.players:
+      self.players[mark] = MCTSPlayer(player.name, player.piece, self.time_budget,
+                                      workers=self.workers, seed=rng.getrandbits(32), verbose=False)
+    return self.players[mark].choose(board)
+
+if __name__ == "__main__":
+  from design import PieceTypeX, PieceTypeO, Game, make_board, get_board_size
+  human = Player("Player1", PieceTypeX())
+  computer = MCTSPlayer("Computer", PieceTypeO())
+  game = Game(make_board(get_board_size()), human, computer)
+  print("Results: ")
+  game.play()
@@ -0,0 +1,192 @@
+# Self-play -> headless batches of games between pluggable move policies
+#
+# A policy picks a cell for the side to move; PolicyPlayer wraps any policy
+# as a Player so it also works with Game. play_game() is the headless loop
+# (no input(), no print) on the fast board backends. run_selfplay() splits N
+# games into chunks, plays them on a process pool and streams the running
+# totals as chunks finish.
+#
+#   python selfplay.py --games 20000 --n 3 --x random --o heuristic --workers 4
+#   python selfplay.py --games 200 --n 4 --x search:0.05 --o heuristic
+#   python selfplay.py --games 200 --n 100 --k 5 --x heuristic --o heuristic
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from design import Player, PieceTypeX, PieceTypeO, MovePolicy, make_board
+from ai import AlphaBetaSearch, board_bits
+from mcts import MCTSPolicy
+from tablebase import SolvedTable
+
+# 1. Policies
+class RandomPolicy(MovePolicy):
+  def choose(self, board, player, rng):
+    return rng.choice(board.empty_cells())
+
+class HeuristicPolicy(MovePolicy):
+  # win if possible, otherwise block, otherwise the most central free cell
+  def choose(self, board, player, rng):
+    cells = board.empty_cells()
+    opponent = OPPONENTS[player.piece.mark.name]
+    for who in (player, opponent):
+      for cell in cells:
+        board.mark(cell, who)
+        won = board.winner is not None
+        board.undo()
+        if won:
+          return cell
+    center = (board.n - 1) / 2.0 if board.n is not None else 0.0
+    best = min(abs(x - center) + abs(y - center) for x, y in cells)
+    return rng.choice([(x, y) for x, y in cells if abs(x - center) + abs(y - center) == best])
+
+class SearchPolicy(MovePolicy):
+  def __init__(self, time_budget=0.05, max_depth=None):
+    self.time_budget = time_budget
+    self.max_depth = max_depth
+    self.searches = {}
+
+  def choose(self, board, player, rng):
+    mark = player.piece.mark.name
+    if mark not in self.searches or self.searches[mark].n != board.n:
+      self.searches[mark] = AlphaBetaSearch(board.n, seed=rng.getrandbits(32))
+    me, opp = board_bits(board, mark)
+    cell, _ = self.searches[mark].best_move(me, opp, self.time_budget, self.max_depth)
+    return divmod(cell, board.n)
+
+class TablePolicy(MovePolicy):
+  def __init__(self, path):
+    self.table = SolvedTable(path)
+
+  def choose(self, board, player, rng):
+    if board.n != self.table.n:
+      raise ValueError(f"the table is for {self.table.n}x{self.table.n} boards, not {board.n}x{board.n}")
+    result = self.table.lookup_board(board)
+    if result is None:
+      raise ValueError("position is not in the solved table (finished or unreachable)")
+    return divmod(result[2], board.n)
+
+class PolicyPlayer(Player):
+  def __init__(self, name, piece, policy, seed=None):
+    super().__init__(name, piece)
+    self.policy = policy
+    self.rng = random.Random(seed)
+
+  def get_move(self, board):
+    return self.policy.choose(board, self, self.rng)
+
+OPPONENTS = {"X": Player("O", PieceTypeO()), "O": Player("X", PieceTypeX())}
+
+def make_policy(spec):
+  # "random", "heuristic", "search[:<seconds per move>]", "mcts[:<seconds per move>]"
+  # or "table:<solved-position table file>"
+  name, _, argument = spec.partition(":")
+  if name == "random":
+    return RandomPolicy()
+  if name == "heuristic":
+    return HeuristicPolicy()
+  if name == "search":
+    return SearchPolicy(float(argument) if argument else 0.05)
+  if name == "mcts":
+    return MCTSPolicy(float(argument) if argument else 0.1)
+  if name == "table":
+    return TablePolicy(argument)
+  raise ValueError(f"unknown policy {spec!r}")
+
+# search, MCTS and the solved tables play n in a row on a bounded n x n board
+FULL_LINE_POLICIES = ("search", "mcts", "table")
+
+def check_policy(spec, n, k=None):
+  name = spec.partition(":")[0]
+  if name in FULL_LINE_POLICIES and (n is None or (k is not None and k != n)):
+    raise ValueError(f"policy {name!r} only plays {n or 'n'} in a row on a bounded board, not k={k}")
+  if name == "table":
+    with SolvedTable(spec.partition(":")[2]) as table:
+      if table.n != n:
+        raise ValueError(f"table {spec.partition(':')[2]!r} is for {table.n}x{table.n} boards, not {n}x{n}")
+
+# 2. Headless games
+def play_game(n, player_x, player_o, rng, k=None, max_moves=None):
+  # returns (winning mark or None, number of moves); n=None is an unbounded
+  # k-in-a-row board, which needs max_moves to be sure to stop
+  board = make_board(n, k)
+  current, other = player_x, player_o
+  while not board.is_full() and board.winner is None and board.spots_filled != max_moves:
+    board.mark(current.policy.choose(board, current, rng), current)
+    current, other = other, current
+  return board.winner, board.spots_filled
+
+def play_chunk(n, x_spec, o_spec, games, seed, k=None, max_moves=None):
+  for spec in (x_spec, o_spec):
+    check_policy(spec, n, k)
+  rng = random.Random(seed)
+  player_x = PolicyPlayer("X", PieceTypeX(), make_policy(x_spec))
+  player_o = PolicyPlayer("O", PieceTypeO(), make_policy(o_spec))
+  stats = {"games": 0, "X": 0, "O": 0, "draws": 0, "moves": 0, "max_length": 0, "seconds": 0.0}
+  start = time.perf_counter()
+  for _ in range(games):
+    winner, moves = play_game(n, player_x, player_o, rng, k, max_moves)
+    stats["games"] += 1
+    stats[winner or "draws"] += 1
+    stats["moves"] += moves
+    stats["max_length"] = max(stats["max_length"], moves)
+  stats["seconds"] = time.perf_counter() - start
+  return stats
+
+# 3. Process pool driver
+def merge(total, chunk):
+  for key, value in chunk.items():
+    total[key] = max(total.get(key, 0), value) if key == "max_length" else total.get(key, 0) + value
+  return total
+
+def summary(total, elapsed, workers):
+  games = total.get("games", 0) or 1
+  return {"games": total.get("games", 0), "workers": workers,
+          "x_win_rate": total.get("X", 0) / games, "o_win_rate": total.get("O", 0) / games,
+          "draw_rate": total.get("draws", 0) / games,
+          "mean_length": total.get("moves", 0) / games, "max_length": total.get("max_length", 0),
+          "games_per_sec": total.get("games", 0) / elapsed if elapsed else 0.0,
+          "moves_per_sec": total.get("moves", 0) / elapsed if elapsed else 0.0,
+          "elapsed_sec": elapsed}
+
+def run_selfplay(n, x_spec, o_spec, games, workers=None, chunk_size=200, seed=0, k=None, max_moves=None):
+  # generator: yields the running summary after every finished chunk
+  for spec in (x_spec, o_spec):
+    check_policy(spec, n, k)
+  make_board(n, k)   # rejects k > n before any worker starts
+  workers = workers or os.cpu_count() or 1
+  chunks = [min(chunk_size, games - start) for start in range(0, games, chunk_size)]
+  total = {}
+  start = time.perf_counter()
+  with ProcessPoolExecutor(max_workers=workers) as pool:
+    futures = [pool.submit(play_chunk, n, x_spec, o_spec, size, seed * 1_000_003 + i, k, max_moves)
+               for i, size in enumerate(chunks)]
+    for future in as_completed(futures):
+      merge(total, future.result())
+      yield summary(total, time.perf_counter() - start, workers)
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="headless TicTacToe self-play")
+  parser.add_argument("--games", type=int, default=10000)
+  parser.add_argument("--n", type=int, default=3, help="board size, 0 for an unbounded board")
+  parser.add_argument("--k", type=int, default=None, help="marks in a row to win (default n)")
+  parser.add_argument("--max-moves", type=int, default=None, help="stop a game as a draw after this many moves")
+  parser.add_argument("--x", default="random", help="policy for X: random, heuristic, search[:seconds], mcts[:seconds], table:path")
+  parser.add_argument("--o", default="heuristic", help="policy for O")
+  parser.add_argument("--workers", type=int, default=None)
+  parser.add_argument("--chunk", type=int, default=200, help="games per task")
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--quiet", action="store_true", help="only print the final summary")
+  args = parser.parse_args()
+  result = None
+  n = args.n or None
+  if n is None and args.max_moves is None:
+    args.max_moves = 10_000
+  for result in run_selfplay(n, args.x, args.o, args.games, args.workers, args.chunk, args.seed,
+                             args.k, args.max_moves):
+    if not args.quiet:
+      print(f"{result['games']:>8} games  X {result['x_win_rate']:.3f}  O {result['o_win_rate']:.3f}  "
+            f"draw {result['draw_rate']:.3f}  {result['moves_per_sec']:,.0f} moves/s")
+  print(json.dumps(result, indent=2))
@@ -0,0 +1,218 @@
+# Game server -> many concurrent TicTacToe games over asyncio
+#
+# Line protocol (client -> server):
+#   JOIN <n>        wait for an opponent who wants the same board size
+#   MOVE <xy>       mark cell x, y (same two-digit format as the console game)
+#   QUIT
+# Server -> client:
+#   START <game_id> <X|O> <n>      X moves first
+#   MOVED <X|O> <xy>               sent to both players after every valid move
+#   END <X|O|DRAW|ABANDONED>
+#   ERR <message>
+#
+# Every session is a Game with its own board from make_board(); moves are
+# checked with Game.validate_input() and Board.mark() like the console game.
+# Sessions that have been idle for idle_seconds are frozen into a few bytes
+# (one byte per cell) and the Game is rebuilt on the next move.
+#
+#   python server.py --port 8700
+import argparse
+import asyncio
+import itertools
+import time
+from collections import defaultdict, deque
+
+from design import Player, PieceTypeX, PieceTypeO, Game, make_board, MARK_CODES, CODE_MARKS
+
+class Session:
+  __slots__ = ("game_id", "n", "writers", "game", "frozen", "frozen_turn", "last_active")
+
+  def __init__(self, game_id, n, writer_x, writer_o):
+    self.game_id = game_id
+    self.n = n
+    self.writers = {"X": writer_x, "O": writer_o}
+    self.game = Game(make_board(n), Player("X", PieceTypeX()), Player("O", PieceTypeO()))
+    self.frozen = None
+    self.frozen_turn = None
+    self.last_active = time.monotonic()
+
+  def freeze(self):
+    board = self.game.board
+    self.frozen = bytes(MARK_CODES.get(board.cell(x, y), 0) for x in range(self.n) for y in range(self.n))
+    self.frozen_turn = self.game.current_player.piece.mark.name
+    self.game = None
+
+  def thaw(self):
+    game = Game(make_board(self.n), Player("X", PieceTypeX()), Player("O", PieceTypeO()))
+    players = {"X": game.player1, "O": game.player2}
+    for cell, code in enumerate(self.frozen):
+      if code:
+        game.board.mark(divmod(cell, self.n), players[CODE_MARKS[code]])
+    game.current_player = players[self.frozen_turn]
+    self.game = game
+    self.frozen = self.frozen_turn = None
+
+class GameServer:
+  def __init__(self, idle_seconds=30.0):
+    self.idle_seconds = idle_seconds
+    self.waiting = defaultdict(deque)   # n -> writers waiting for an opponent
+    self.sessions = {}
+    self.ids = itertools.count(1)
+    self.moves = 0
+    self.games_finished = 0
+    self._janitor = None
+    self._server = None
+
+  async def start(self, host="127.0.0.1", port=8700):
+    self._janitor = asyncio.create_task(self._freeze_idle())
+    self._server = await asyncio.start_server(self._handle, host, port, backlog=4096)
+    return self._server
+
+  async def stop(self):
+    if self._server:
+      self._server.close()
+      await self._server.wait_closed()
+      self._server = None
+    if self._janitor:
+      self._janitor.cancel()
+      await asyncio.gather(self._janitor, return_exceptions=True)
+      self._janitor = None
+
+  # 1. Connections
+  async def _handle(self, reader, writer):
+    state = {"session": None, "mark": None, "waiting": None}   # waiting: board size queued for
+    try:
+      while True:
+        line = await reader.readline()
+        if not line:
+          break
+        parts = line.decode(errors="replace").split()
+        if not parts:
+          continue
+        command = parts[0].upper()
+        session = state["session"]
+        if session is not None and session.game_id not in self.sessions:
+          session = state["session"] = None   # game over, the player may JOIN again
+        if command == "JOIN" and (session is not None or state["waiting"] is not None):
+          writer.write(b"ERR already joined\n")
+        elif command == "JOIN" and len(parts) == 2:
+          self.join(writer, parts[1], state)
+        elif command == "MOVE" and len(parts) == 2 and session is not None:
+          self.move(session, state["mark"], parts[1], writer)
+        elif command == "MOVE":
+          writer.write(b"ERR no game\n")
+        elif command == "QUIT":
+          break
+        else:
+          writer.write(b"ERR bad request\n")
+        await writer.drain()
+    except ConnectionError:
+      pass
+    finally:
+      self.leave(writer, state)
+      writer.close()
+
+  # 2. Matchmaking
+  def join(self, writer, size, state):
+    try:
+      n = int(size)
+    except ValueError:
+      writer.write(b"ERR board size must be an integer\n")
+      return
+    if not 3 <= n <= 10:
+      writer.write(b"ERR board size must be between 3 and 10\n")
+      return
+    queue = self.waiting[n]
+    if not queue:
+      queue.append((writer, state))
+      state["waiting"] = n
+      return
+    other_writer, other_state = queue.popleft()
+    session = Session(next(self.ids), n, other_writer, writer)
+    self.sessions[session.game_id] = session
+    other_state.update(session=session, mark="X", waiting=None)
+    state.update(session=session, mark="O")
+    for mark, player_writer in session.writers.items():
+      player_writer.write(f"START {session.game_id} {mark} {n}\n".encode())
+
+  def leave(self, writer, state):
+    session = state["session"]
+    if session is None:
+      if state["waiting"] is not None:
+        queue = self.waiting[state["waiting"]]
+        for entry in list(queue):
+          if entry[0] is writer:
+            queue.remove(entry)
+        state["waiting"] = None
+      return
+    if session.game_id in self.sessions:
+      self.finish(session, "ABANDONED")
+
+  # 3. Moves
+  def move(self, session, mark, position, writer):
+    if session.frozen is not None:
+      session.thaw()
+    session.last_active = time.monotonic()
+    game = session.game
+    if game.current_player.piece.mark.name != mark:
+      writer.write(b"ERR not your turn\n")
+      return
+    try:
+      game.validate_input(position)
+      game.board.mark(position, game.current_player)
+    except Exception as e:
+      writer.write(f"ERR {e}\n".encode())
+      return
+    self.moves += 1
+    message = f"MOVED {mark} {position}\n".encode()
+    for player_writer in session.writers.values():
+      player_writer.write(message)
+    if game.board.has_winner():
+      self.finish(session, mark)
+    elif game.board.is_full():
+      self.finish(session, "DRAW")
+    else:
+      game.switch_player()
+
+  def finish(self, session, result):
+    del self.sessions[session.game_id]
+    self.games_finished += 1
+    for player_writer in session.writers.values():
+      if not player_writer.is_closing():
+        player_writer.write(f"END {result}\n".encode())
+
+  # 4. Idle sessions
+  async def _freeze_idle(self):
+    while True:
+      await asyncio.sleep(max(1.0, self.idle_seconds / 4))
+      cutoff = time.monotonic() - self.idle_seconds
+      for session in list(self.sessions.values()):
+        if session.game is not None and session.last_active < cutoff:
+          session.freeze()
+
+  def stats(self):
+    frozen = sum(1 for session in self.sessions.values() if session.frozen is not None)
+    return {"sessions": len(self.sessions), "frozen": frozen, "moves": self.moves,
+            "games_finished": self.games_finished,
+            "waiting": sum(len(queue) for queue in self.waiting.values())}
+
+async def serve(args):
+  game_server = GameServer(args.idle)
+  server = await game_server.start(args.host, args.port)
+  print(f"TicTacToe server listening on {args.host}:{args.port}")
+  async with server:
+    try:
+      await server.serve_forever()
+    finally:
+      await game_server.stop()
+      print(game_server.stats())
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="asyncio server hosting many TicTacToe games")
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=8700)
+  parser.add_argument("--idle", type=float, default=30.0, help="seconds before an idle game is frozen")
+  try:
+    asyncio.run(serve(parser.parse_args()))
+  except KeyboardInterrupt:
+    pass
@@ -0,0 +1,236 @@
+# Tablebase -> solved positions for small boards in a memory-mapped file
+#
+# build() walks every position reachable from the empty board (X moves first,
+# play stops at a win), solves it with full minimax and keeps one entry per
+# symmetry class: the smallest of the 8 rotated/reflected bitboard keys.
+# Each entry holds the value for the side to move (1 win, 0 draw, -1 loss),
+# the number of plies to the end under best play and the best move, all in
+# the orientation of the canonical key.
+#
+# File layout (little-endian, standard sizes, no padding):
+#   header  "<8sBBHIQ" magic, n, cells, reserved, reserved, count
+#   keys    count x uint64, sorted   key = x_bits << cells | o_bits
+#   values  count x int8
+#   plies   count x uint8
+#   moves   count x uint8
+# SolvedTable maps the file and answers a position with a binary search over
+# the key column; nothing but the pages touched is read into memory.
+#
+#   python tablebase.py build --n 3 --output solved3.tbl
+#   python tablebase.py build --n 4 --output solved4.tbl     (about 40 s)
+#   python tablebase.py query solved3.tbl --moves 11 00
+import argparse
+import mmap
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+
+from design import Player, BitBoard
+from ai import symmetries, board_bits
+
+MAGIC = b"TTTSOLV1"
+HEADER = struct.Struct("<8sBBHIQ")
+MAX_N = 4
+
+class SymmetryKeys:
+  # canonical keys through per-byte lookup tables: a permutation of the cells
+  # is applied to a bitboard one byte at a time
+  def __init__(self, n):
+    self.n = n
+    self.cells = n * n
+    self.perms, self.inverses = symmetries(n)
+    self.chunks = (self.cells + 7) // 8
+    self.tables = []
+    for perm in self.perms:
+      per_chunk = []
+      for chunk in range(self.chunks):
+        table = [0] * 256
+        for byte in range(256):
+          bits = 0
+          for i in range(8):
+            cell = chunk * 8 + i
+            if byte >> i & 1 and cell < self.cells:
+              bits |= 1 << perm[cell]
+          table[byte] = bits
+        per_chunk.append(table)
+      self.tables.append(per_chunk)
+
+  def permute(self, bits, sym):
+    result = 0
+    for table in self.tables[sym]:
+      result |= table[bits & 0xFF]
+      bits >>= 8
+    return result
+
+  def canonical(self, x, o):
+    # (smallest key over the 8 symmetries, symmetry that produced it)
+    cells = self.cells
+    best, best_sym = None, 0
+    for sym in range(8):
+      key = self.permute(x, sym) << cells | self.permute(o, sym)
+      if best is None or key < best:
+        best, best_sym = key, sym
+    return best, best_sym
+
+# 1. Builder
+class Solver:
+  def __init__(self, n):
+    if n > MAX_N:
+      raise ValueError(f"boards larger than {MAX_N}x{MAX_N} are too big to solve completely")
+    self.n = n
+    self.cells = n * n
+    self.full = (1 << self.cells) - 1
+    self.lines_through = BitBoard.line_masks(n)[1]
+    self.keys = SymmetryKeys(n)
+    self.memo = {}   # canonical key -> (value, plies, canonical move)
+
+  def solve(self, x=0, o=0):
+    # (value, plies) for the side to move in position (x, o)
+    key, sym = self.keys.canonical(x, o)
+    entry = self.memo.get(key)
+    if entry is not None:
+      return entry[0], entry[1]
+    x_to_move = (x | o).bit_count() % 2 == 0
+    mine, theirs = (x, o) if x_to_move else (o, x)
+    occupied = x | o
+    best = None
+    for cell in range(self.cells):
+      bit = 1 << cell
+      if occupied & bit:
+        continue
+      new = mine | bit
+      if any(new & mask == mask for mask in self.lines_through[cell]):
+        value, plies = 1, 1
+      elif occupied | bit == self.full:
+        value, plies = 0, 1
+      else:
+        child_value, child_plies = self.solve(*((new, theirs) if x_to_move else (theirs, new)))
+        value, plies = -child_value, child_plies + 1
+      # prefer the better value, then the fastest win or the slowest loss
+      rank = (value, -plies if value > 0 else plies)
+      if best is None or rank > best[0]:
+        best = (rank, value, plies, cell)
+    _, value, plies, cell = best
+    self.memo[key] = (value, plies, self.keys.perms[sym][cell])
+    return value, plies
+
+def build(n, path):
+  start = time.perf_counter()
+  solver = Solver(n)
+  root_value, _ = solver.solve()
+  solve_sec = time.perf_counter() - start
+  keys = array("Q", sorted(solver.memo))
+  values, plies, moves = array("b"), array("B"), array("B")
+  for key in keys:
+    value, depth, move = solver.memo[key]
+    values.append(value)
+    plies.append(depth)
+    moves.append(move)
+  if sys.byteorder != "little":
+    keys.byteswap()
+  with open(path, "wb") as f:
+    f.write(HEADER.pack(MAGIC, n, n * n, 0, 0, len(keys)))
+    for column in (keys, values, plies, moves):
+      column.tofile(f)
+  return {"n": n, "positions": len(keys), "root_value": root_value, "solve_sec": solve_sec,
+          "bytes": HEADER.size + len(keys) * 11}
+
+# 2. Lookup
+class SolvedTable:
+  def __init__(self, path):
+    self.file = open(path, "rb")
+    self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, n, cells, _, _, count = HEADER.unpack_from(self.map, 0)
+    if magic != MAGIC or cells != n * n:
+      self.close()
+      raise ValueError(f"{path} is not a solved-position table")
+    if sys.byteorder != "little":
+      self.close()
+      raise ValueError("solved-position tables are little-endian")
+    self.n = n
+    self.cells = cells
+    self.count = count
+    offset = HEADER.size
+    self.view = memoryview(self.map)
+    self.keys = self.view[offset:offset + 8 * count].cast("Q")
+    offset += 8 * count
+    self.values = self.view[offset:offset + count].cast("b")
+    self.plies = self.view[offset + count:offset + 2 * count]
+    self.moves = self.view[offset + 2 * count:offset + 3 * count]
+    self.symmetry = SymmetryKeys(n)
+
+  def lookup(self, x, o):
+    # (value for the side to move, plies to the end, best cell) or None if the
+    # position is not in the table (finished, or not reachable)
+    key, sym = self.symmetry.canonical(x, o)
+    index = bisect_left(self.keys, key)
+    if index == self.count or self.keys[index] != key:
+      return None
+    cell = self.symmetry.inverses[sym][self.moves[index]]
+    return self.values[index], self.plies[index], cell
+
+  def lookup_board(self, board):
+    x, o = board_bits(board, "X")
+    return self.lookup(x, o)
+
+  def __len__(self):
+    return self.count
+
+  def close(self):
+    for name in ("keys", "values", "plies", "moves", "view"):
+      view = self.__dict__.pop(name, None)
+      if view is not None:
+        view.release()
+    self.map.close()
+    self.file.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+class TablePlayer(Player):
+  def __init__(self, name, piece, table):
+    super().__init__(name, piece)
+    self.table = table
+
+  def get_move(self, board):
+    value, plies, cell = self.table.lookup_board(board)
+    x, y = divmod(cell, board.n)
+    outcome = {1: "win", 0: "draw", -1: "loss"}[value]
+    print(f"{self.name} plays {x}{y} ({outcome} in {plies})")
+    return (x, y)
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="build or query solved TicTacToe position tables")
+  commands = parser.add_subparsers(dest="command", required=True)
+  build_parser = commands.add_parser("build")
+  build_parser.add_argument("--n", type=int, default=3)
+  build_parser.add_argument("--output", required=True)
+  query_parser = commands.add_parser("query")
+  query_parser.add_argument("table")
+  query_parser.add_argument("--moves", nargs="*", default=[], help="cells played so far, X first, e.g. 11 00")
+  args = parser.parse_args()
+
+  if args.command == "build":
+    sys.setrecursionlimit(10_000)
+    print(build(args.n, args.output))
+  else:
+    with SolvedTable(args.table) as table:
+      x = o = 0
+      for i, move in enumerate(args.moves):
+        bit = 1 << (int(move[0]) * table.n + int(move[1]))
+        if i % 2 == 0:
+          x |= bit
+        else:
+          o |= bit
+      result = table.lookup(x, o)
+      if result is None:
+        print("position is finished or not reachable")
+      else:
+        value, plies, cell = result
+        print(f"{len(table)} positions; side to move: {'XO'[len(args.moves) % 2]}, "
+              f"value {value}, plies {plies}, best move {cell // table.n}{cell % table.n}")
@@ -0,0 +1,161 @@
+# Benchmark -> replay traffic traces against dispatch and scheduling policies
+#
+# Traces are generators of (time, source, destination) in time order:
+#   up-peak    arrivals at the lobby going up (morning)
+#   lunch      to and from the lobby in both directions, some inter-floor
+#   down-peak  everyone going down to the lobby (evening)
+#   day        a working day: the three peaks on top of light inter-floor
+#              traffic, merged lazily with heapq.merge
+#   csv:PATH   rows of time,source,destination read one at a time
+# Nothing is materialized: each policy run pulls a fresh trace from the same
+# seed (or re-reads the file) and the Simulation keeps no per-request lists;
+# wait and ride percentiles come from telemetry histograms. The same seed
+# gives the same results; wall-clock timings are reported separately.
+#
+#   python benchmark.py --trace day --elevators 6 --floors 40
+#   python benchmark.py --trace up-peak --rate 3000 --hours 2 --output up.json
+#   python benchmark.py --trace csv:lobby.csv --policies cost/look nearest/fifo
+import argparse
+import csv
+import heapq
+import json
+import random
+import sys
+
+from design import LookScheduler, FifoScheduler, NearestCarDispatch, CostDispatch
+from simulation import Simulation
+from telemetry import Telemetry
+
+SCHEDULERS = {"look": LookScheduler, "fifo": FifoScheduler}
+POLICIES = ["nearest/fifo", "nearest/look", "cost/fifo", "cost/look"]
+
+# 1. Traces
+def poisson(rate_per_hour, start_hour, end_hour, pick, rng):
+    now, end = start_hour * 3600.0, end_hour * 3600.0
+    while True:
+        now += rng.expovariate(rate_per_hour / 3600.0)
+        if now >= end:
+            return
+        source, destination = pick(rng)
+        yield now, source, destination
+
+def up_peak(floors, rate, start_hour, end_hour, rng):
+    # 90% from the lobby, the rest between upper floors
+    def pick(rng):
+        if rng.random() < 0.9:
+            return 1, rng.randint(2, floors)
+        return tuple(rng.sample(range(2, floors + 1), 2))
+    return poisson(rate, start_hour, end_hour, pick, rng)
+
+def down_peak(floors, rate, start_hour, end_hour, rng):
+    def pick(rng):
+        if rng.random() < 0.9:
+            return rng.randint(2, floors), 1
+        return tuple(rng.sample(range(2, floors + 1), 2))
+    return poisson(rate, start_hour, end_hour, pick, rng)
+
+def lunch(floors, rate, start_hour, end_hour, rng):
+    # 40% down to the lobby, 40% back up, 20% inter-floor
+    def pick(rng):
+        roll = rng.random()
+        floor = rng.randint(2, floors)
+        if roll < 0.4:
+            return floor, 1
+        if roll < 0.8:
+            return 1, floor
+        return tuple(rng.sample(range(2, floors + 1), 2))
+    return poisson(rate, start_hour, end_hour, pick, rng)
+
+def interfloor(floors, rate, start_hour, end_hour, rng):
+    return poisson(rate, start_hour, end_hour, lambda rng: tuple(rng.sample(range(1, floors + 1), 2)), rng)
+
+def day(floors, rate, seed):
+    # peaks at rate requests/hour, background at a tenth of it, 07:00-19:00
+    phases = [(interfloor, rate / 10, 7.0, 19.0), (up_peak, rate, 7.5, 9.5),
+              (lunch, rate * 0.6, 11.5, 13.5), (down_peak, rate, 16.5, 18.5)]
+    streams = [pattern(floors, phase_rate, start, end, random.Random(seed * 100 + i))
+               for i, (pattern, phase_rate, start, end) in enumerate(phases)]
+    return heapq.merge(*streams)
+
+def csv_trace(path):
+    # time,source,destination per row (seconds, floors); a header row is skipped
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip().replace(".", "", 1).isdigit():
+                continue
+            yield float(row[0]), int(row[1]), int(row[2])
+
+def make_trace(spec, floors, rate, hours, seed):
+    if spec.startswith("csv:"):
+        return csv_trace(spec[4:])
+    if spec == "day":
+        return day(floors, rate, seed)
+    patterns = {"up-peak": up_peak, "down-peak": down_peak, "lunch": lunch, "interfloor": interfloor}
+    if spec not in patterns:
+        raise ValueError(f"unknown trace {spec!r}")
+    return patterns[spec](floors, rate, 0.0, hours, random.Random(seed))
+
+# 2. Runs
+def run_policy(policy, args):
+    dispatch_name, scheduler_name = policy.split("/")
+    dispatch = (CostDispatch(args.floor_time, args.door_time) if dispatch_name == "cost"
+                else NearestCarDispatch())
+    telemetry = Telemetry(time_locks=False)
+    simulation = Simulation(args.elevators, args.capacity, SCHEDULERS[scheduler_name],
+                            args.floor_time, args.door_time, dispatch, args.max_pending,
+                            telemetry, keep_samples=False)
+    stats = simulation.run(make_trace(args.trace, args.floors, args.rate, args.hours, args.seed))
+    histograms = telemetry.snapshot()["histograms"]
+    wait, ride = histograms["wait_us"], histograms["ride_us"]
+    delivered = stats["delivered"]
+    return {
+        "policy": policy,
+        "requests": stats["requests"], "delivered": delivered,
+        "rejected": stats["queues"]["admissions"]["REJECTED"],
+        "wait_mean_sec": wait.get("mean", 0) / 1e6, "wait_p95_sec": wait.get("p95", 0) / 1e6,
+        "ride_mean_sec": ride.get("mean", 0) / 1e6,
+        # trips delivered per hour from the first call to the last drop-off
+        "throughput_per_hour": delivered / stats["busy_hours"] if stats["busy_hours"] else 0.0,
+        "floors_moved": stats["floors_moved"],
+        "floors_per_trip": stats["floors_moved"] / delivered if delivered else 0.0,
+        "pending_high_water": stats["queues"]["pending_high_water"],
+    }, {"policy": policy, "wall_sec": stats["wall_sec"], "events_per_sec": stats["events_per_sec"]}
+
+COLUMNS = [("policy", "policy", "{:<13}"), ("delivered", "delivered", "{:>9}"),
+           ("wait_mean_sec", "wait avg", "{:>9.1f}"), ("wait_p95_sec", "wait p95", "{:>9.1f}"),
+           ("ride_mean_sec", "ride avg", "{:>9.1f}"), ("throughput_per_hour", "trips/h", "{:>9.0f}"),
+           ("floors_moved", "floors", "{:>9}"), ("floors_per_trip", "fl/trip", "{:>9.2f}")]
+
+def print_table(results, out):
+    print("  ".join(f"{header:<13}" if name == "policy" else f"{header:>9}" for name, header, _ in COLUMNS),
+          file=out)
+    for result in results:
+        print("  ".join(fmt.format(result[name]) for name, _, fmt in COLUMNS), file=out)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="compare elevator dispatch/scheduling policies on traffic traces")
+    parser.add_argument("--trace", default="day", help="day, up-peak, lunch, down-peak, interfloor or csv:PATH")
+    parser.add_argument("--policies", nargs="*", default=POLICIES, help="dispatch/scheduler pairs")
+    parser.add_argument("--elevators", type=int, default=6)
+    parser.add_argument("--capacity", type=int, default=20)
+    parser.add_argument("--max-pending", type=int, default=None)
+    parser.add_argument("--floors", type=int, default=30)
+    parser.add_argument("--rate", type=float, default=2400.0, help="peak requests per hour")
+    parser.add_argument("--hours", type=float, default=2.0, help="length of single-pattern traces")
+    parser.add_argument("--floor-time", type=float, default=1.0)
+    parser.add_argument("--door-time", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write JSON results here")
+    args = parser.parse_args()
+
+    results, timings = [], []
+    for policy in args.policies:
+        result, timing = run_policy(policy, args)
+        results.append(result)
+        timings.append(timing)
+    print_table(results, sys.stdout)
+    if args.output:
+        config = {key: value for key, value in vars(args).items() if key != "output"}
+        with open(args.output, "w") as f:
+            json.dump({"config": config, "results": results, "timing": timings}, f, indent=2)
+            f.write("\n")
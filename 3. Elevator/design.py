@@ -1,59 +1,274 @@
 from enum import Enum
 import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from collections import deque, namedtuple
 from threading import Lock, Condition, Thread
 
+from telemetry import TimedLock
+
+try:
+    import numpy as np
+except ImportError:  # optional: only used to score very large fleets
+    np = None
+
 class Direction(Enum):
   UP = 1
   DOWN = 2
 
+def opposite(direction):
+  return Direction.DOWN if direction == Direction.UP else Direction.UP
+
+def direction_to(floor, target, current):
+  # direction from floor towards target; keeps current when already there
+  if target > floor:
+    return Direction.UP
+  if target < floor:
+    return Direction.DOWN
+  return current
+
+# Scheduling -> which floor a car stops at next (Strategy)
+# A scheduler owns a car's pending requests. Every method is called with the
+# car's lock held.
+class Scheduler(ABC):
+    @abstractmethod
+    def add(self, request):
+        pass
+
+    @abstractmethod
+    def next_stop(self, floor, direction):
+        """(floor, direction to serve it in) of the next stop, or None when idle."""
+
+    @abstractmethod
+    def arrive(self, floor, direction):
+        """Serve a stop; returns (picked up, dropped off) requests."""
+
+    @abstractmethod
+    def pending(self):
+        """Requests accepted and not yet dropped off."""
+
+    @abstractmethod
+    def stop_floors(self):
+        """Floors the car still has to visit."""
+
+class FifoScheduler(Scheduler):
+    # one request at a time in arrival order: to its source floor, then to its destination
+    def __init__(self):
+        self.queue = deque()
+        self.riding = None
+
+    def add(self, request):
+        self.queue.append(request)
+
+    def next_stop(self, floor, direction):
+        if self.riding is not None:
+            target = self.riding.destination_floor
+        elif self.queue:
+            target = self.queue[0].source_floor
+        else:
+            return None
+        return target, direction_to(floor, target, direction)
+
+    def arrive(self, floor, direction):
+        picked, dropped = [], []
+        if self.riding is None and self.queue and self.queue[0].source_floor == floor:
+            self.riding = self.queue.popleft()
+            picked.append(self.riding)
+        if self.riding is not None and self.riding.destination_floor == floor:
+            dropped.append(self.riding)
+            self.riding = None
+        return picked, dropped
+
+    def pending(self):
+        return len(self.queue) + (self.riding is not None)
+
+    def stop_floors(self):
+        floors = [self.riding.destination_floor] if self.riding is not None else []
+        for request in self.queue:
+            floors.append(request.source_floor)
+            floors.append(request.destination_floor)
+        return floors
+
+class LookScheduler(Scheduler):
+    # LOOK: keep going one way while there are stops ahead, stopping for
+    # drop-offs and for riders waiting to go the same way; turn at the last
+    # stop. Stop floors are kept in one sorted list, so the next stop is a
+    # bisect plus a short walk.
+    def __init__(self):
+        self.pickups = {}    # floor -> requests waiting there
+        self.dropoffs = {}   # floor -> requests riding to there
+        self.floors = []     # sorted floors that have pickups or drop-offs
+        self.count = 0
+
+    def add_floor(self, floor):
+        i = bisect_left(self.floors, floor)
+        if i == len(self.floors) or self.floors[i] != floor:
+            self.floors.insert(i, floor)
+
+    def add(self, request):
+        self.pickups.setdefault(request.source_floor, []).append(request)
+        self.add_floor(request.source_floor)
+        self.count += 1
+
+    def wants_stop(self, floor, direction):
+        if floor in self.dropoffs:
+            return True
+        return any(request.direction == direction for request in self.pickups.get(floor, ()))
+
+    def next_stop(self, floor, direction):
+        floors = self.floors
+        if not floors:
+            return None
+        for sweep in (direction, opposite(direction)):
+            if sweep == Direction.UP:
+                ahead = floors[bisect_left(floors, floor):]
+            else:
+                ahead = floors[:bisect_right(floors, floor)][::-1]
+            for stop in ahead:
+                if self.wants_stop(stop, sweep):
+                    return stop, sweep
+            if ahead:
+                # only riders going the other way are left ahead: turn at the farthest one
+                return ahead[-1], opposite(sweep)
+        return None
+
+    def arrive(self, floor, direction):
+        dropped = self.dropoffs.pop(floor, [])
+        waiting = self.pickups.pop(floor, [])
+        picked = [request for request in waiting if request.direction == direction]
+        if len(picked) < len(waiting):
+            self.pickups[floor] = [request for request in waiting if request.direction != direction]
+        for request in picked:
+            self.dropoffs.setdefault(request.destination_floor, []).append(request)
+            self.add_floor(request.destination_floor)
+        if floor not in self.pickups and floor not in self.dropoffs:
+            self.floors.pop(bisect_left(self.floors, floor))
+        self.count -= len(dropped)
+        return picked, dropped
+
+    def pending(self):
+        return self.count
+
+    def stop_floors(self):
+        return self.floors
+
+MOVE = "move"
+STOP = "stop"
+# what one call to Elevator.step() did: moved to floor, or stopped there
+Step = namedtuple("Step", ["kind", "floor", "picked", "dropped"])
+# what dispatch sees of a car, read in one go under the car's lock
+CarState = namedtuple("CarState", ["id", "floor", "up", "pending", "capacity", "low", "high", "stops"])
+
 class Elevator:
-    def __init__(self, id: int, capacity: int):
+    def __init__(self, id: int, capacity: int, scheduler: Scheduler = None,
+                 floor_time: float = 1.0, door_time: float = 1.0, verbose: bool = True,
+                 clock=time.monotonic, telemetry=None):
         self.id = id
         self.capacity = capacity
         self.current_floor = 1
         self.current_direction = Direction.UP
-        self.requests = []
-        self.lock = Lock()
+        self.scheduler = scheduler or LookScheduler()
+        self.floor_time = floor_time  # seconds to travel one floor
+        self.door_time = door_time    # seconds spent at a stop
+        self.verbose = verbose
+        self.clock = clock            # real time, or the simulated clock of a Simulation
+        self.floors_moved = 0
+        self.running = True
+        self.on_dropoff = None        # called (outside the lock) after riders leave the car
+        self.telemetry = telemetry
+        self.lock = TimedLock(telemetry) if telemetry is not None and telemetry.time_locks else Lock()
         self.condition = Condition(self.lock)
 
-    def add_request(self, request):
-        # adding a request safely…
+    def add_request(self, request) -> bool:
+        # adding a request safely… False when the car is full
         with self.lock:  # 1) acquire the mutex
-            if len(self.requests) < self.capacity:
-                self.requests.append(request)
-                print(
-                    f"Elevator {self.id} added request: {request.source_floor} to {request.destination_floor}"
-                )
-                self.condition.notify_all() # 2) wake any threads waiting for a request
-                # lock is re-acquired here, so it’s safe to consume the queue
-
-    def get_next_request(self):
+            if self.scheduler.pending() >= self.capacity:
+                return False
+            self.scheduler.add(request)
+            depth = self.scheduler.pending()
+            self.condition.notify_all() # 2) wake any threads waiting for a request
+            # lock is re-acquired here, so it’s safe to consume the queue
+        # reporting happens after the lock is released, so it never lengthens the critical section
+        if self.telemetry is not None:
+            self.telemetry.record("car_depth", depth)
+        if self.verbose:
+            print(
+                f"Elevator {self.id} added request: {request.source_floor} to {request.destination_floor}"
+            )
+        return True
+
+    def wait_for_request(self):
+        # False once the car has been stopped
         with self.lock: # acquires the same lock
-            while not self.requests:
+            while self.running and not self.scheduler.pending():
                 self.condition.wait() # release the lock & sleep until notify_all()
-            return self.requests.pop(0)
+            return self.running
+
+    def stop(self):
+        with self.lock:
+            self.running = False
+            self.condition.notify_all()
+
+    def step(self):
+        # one unit of work: serve the current floor if it is the next stop,
+        # otherwise move one floor towards it; None when there is nothing to do
+        with self.lock:
+            step = self._step()
+        if step is not None and step.kind == STOP:
+            if self.telemetry is not None:
+                self.telemetry.record_pickups(step.picked)
+                self.telemetry.record_dropoffs(step.dropped)
+            if step.dropped and self.on_dropoff is not None:
+                self.on_dropoff(self)
+        return step
+
+    def _step(self):
+        stop = self.scheduler.next_stop(self.current_floor, self.current_direction)
+        if stop is None:
+            return None
+        floor, direction = stop
+        if floor == self.current_floor:
+            self.current_direction = direction
+            picked, dropped = self.scheduler.arrive(floor, direction)
+            now = self.clock()
+            for request in picked:
+                request.pickup_time = now
+            for request in dropped:
+                request.dropoff_time = now
+            return Step(STOP, floor, picked, dropped)
+        self.current_direction = direction_to(self.current_floor, floor, direction)
+        self.current_floor += 1 if self.current_direction == Direction.UP else -1
+        self.floors_moved += 1
+        return Step(MOVE, self.current_floor, (), ())
+
+    def pending(self):
+        with self.lock:
+            return self.scheduler.pending()
+
+    def snapshot(self):
+        with self.lock:
+            stops = self.scheduler.stop_floors()
+            floor = self.current_floor
+            low = min(min(stops), floor) if stops else floor
+            high = max(max(stops), floor) if stops else floor
+            return CarState(self.id, floor, self.current_direction == Direction.UP,
+                            self.scheduler.pending(), self.capacity, low, high, frozenset(stops))
 
     def process_requests(self):
-        while True:
-            request = self.get_next_request()  # This will wait until there's a request
-            self.process_request(request)
-
-    def process_request(self, request):
-        start_floor = self.current_floor
-        end_floor = request.destination_floor
-
-        if start_floor < end_floor:
-            self.current_direction = Direction.UP
-            for i in range(start_floor, end_floor + 1):
-                self.current_floor = i
-                print(f"Elevator {self.id} reached floor {self.current_floor}")
-                time.sleep(1)  # Simulating elevator movement
-        elif start_floor > end_floor:
-            self.current_direction = Direction.DOWN
-            for i in range(start_floor, end_floor - 1, -1):
-                self.current_floor = i
-                print(f"Elevator {self.id} reached floor {self.current_floor}")
-                time.sleep(1)  # Simulating elevator movement
+        while self.wait_for_request():  # This will wait until there's a request
+            step = self.step()
+            if step is None:
+                continue
+            if self.verbose:
+                self.report(step)
+            time.sleep(self.floor_time if step.kind == MOVE else self.door_time)  # Simulating elevator movement
+
+    def report(self, step):
+        if step.kind == MOVE:
+            print(f"Elevator {self.id} reached floor {step.floor}")
+        else:
+            print(f"Elevator {self.id} stopped at floor {step.floor}: "
+                  f"{len(step.picked)} in, {len(step.dropped)} out")
 
     def run(self):
         self.process_requests()
@@ -62,30 +277,222 @@ class Request:
     def __init__(self, source_floor, destination_floor):
         self.source_floor = source_floor
         self.destination_floor = destination_floor
+        self.request_time = None
+        self.pickup_time = None
+        self.dropoff_time = None
+
+    @property
+    def direction(self):
+        return Direction.UP if self.destination_floor > self.source_floor else Direction.DOWN
+
+# Dispatch -> which car takes a new request (Strategy)
+# rank() gets one CarState per car and returns car indices, best first.
+class DispatchStrategy(ABC):
+    @abstractmethod
+    def rank(self, states, source_floor, destination_floor):
+        pass
+
+class NearestCarDispatch(DispatchStrategy):
+    # the original rule: the car closest to the caller
+    def rank(self, states, source_floor, destination_floor):
+        return sorted(range(len(states)), key=lambda i: abs(source_floor - states[i].floor))
+
+class CostDispatch(DispatchStrategy):
+    # estimated time until the car reaches the caller:
+    #   travel: straight there when the car is idle or already heading that
+    #           way in the rider's direction, otherwise via the far end of its
+    #           current sweep (and back again if the caller is behind it)
+    #   stops:  door_time per pending request
+    #   load:   load_weight * pending / capacity, infinite for a full car
+    # Cars that already stop at the rider's floors get door_time off per shared
+    # stop (never below zero stop time), so riders going the same way are
+    # grouped (destination dispatch).
+    # Full cars always rank last, so the best car in the ranking has room and
+    # the controller only reports REROUTED when that car filled up between the
+    # snapshot and add_request(); NearestCarDispatch ranks full cars by
+    # distance, so there REROUTED is the common way around a full car.
+    # Fleets of vectorize_from cars or more are scored in one NumPy pass when
+    # NumPy is installed.
+    def __init__(self, floor_time=1.0, door_time=1.0, load_weight=10.0, vectorize_from=64):
+        self.floor_time = floor_time
+        self.door_time = door_time
+        self.load_weight = load_weight
+        self.vectorize_from = vectorize_from
+
+    def rank(self, states, source_floor, destination_floor):
+        if np is not None and len(states) >= self.vectorize_from:
+            costs = self.costs_numpy(states, source_floor, destination_floor).tolist()
+        else:
+            costs = self.costs(states, source_floor, destination_floor)
+        return sorted(range(len(states)), key=costs.__getitem__)
+
+    def costs(self, states, source, destination):
+        rider_up = destination > source
+        ft, dt, weight = self.floor_time, self.door_time, self.load_weight
+        costs = []
+        for _, floor, up, pending, capacity, low, high, stops in states:
+            if pending >= capacity:
+                costs.append(float("inf"))
+                continue
+            top, bottom = max(high, source), min(low, source)
+            if not pending:
+                travel = abs(source - floor)
+            elif up:
+                travel = (source - floor if rider_up and source >= floor
+                          else 2 * top - floor - source if not rider_up
+                          else (top - floor) + (top - bottom) + (source - bottom))
+            else:
+                travel = (floor - source if not rider_up and source <= floor
+                          else floor + source - 2 * bottom if rider_up
+                          else (floor - bottom) + (top - bottom) + (top - source))
+            shared = (source in stops) + (destination in stops)
+            costs.append(travel * ft + max(pending - shared, 0) * dt + weight * pending / capacity)
+        return costs
+
+    def costs_numpy(self, states, source, destination):
+        _, *numeric, stops = zip(*states)
+        floor, up, pending, capacity, low, high = (np.array(column) for column in numeric)
+        rider_up = destination > source
+        top, bottom = np.maximum(high, source), np.minimum(low, source)
+        if rider_up:
+            up_travel = np.where(source >= floor, source - floor, (top - floor) + (top - bottom) + (source - bottom))
+            down_travel = floor + source - 2 * bottom
+        else:
+            up_travel = 2 * top - floor - source
+            down_travel = np.where(source <= floor, floor - source, (floor - bottom) + (top - bottom) + (top - source))
+        travel = np.where(pending == 0, np.abs(source - floor), np.where(up, up_travel, down_travel))
+        shared = np.array([(source in s) + (destination in s) for s in stops])
+        costs = (travel * self.floor_time + np.maximum(pending - shared, 0) * self.door_time
+                 + self.load_weight * pending / capacity)
+        return np.where(pending >= capacity, np.inf, costs)
+
+# Admission -> what happened to a request
+class Admission(Enum):
+  ACCEPTED = 1   # the best car took it
+  REROUTED = 2   # the best car was full, another car took it (see CostDispatch)
+  QUEUED = 3     # every car was full; waiting in the controller's pending queue
+  REJECTED = 4   # the pending queue is full too
+
+AdmissionResult = namedtuple("AdmissionResult", ["status", "elevator", "request"])
 
 class ElevatorController:
-    def __init__(self, num_elevators: int, capacity: int):
+    def __init__(self, num_elevators: int, capacity: int, scheduler_factory=LookScheduler,
+                 start_threads: bool = True, clock=time.monotonic, dispatch: DispatchStrategy = None,
+                 max_pending: int = None, telemetry=None, **car_options):
+        # start_threads=False leaves the cars to be driven through Elevator.step(),
+        # e.g. by a Simulation
+        self.clock = clock
+        self.dispatch = dispatch or CostDispatch(car_options.get("floor_time", 1.0),
+                                                 car_options.get("door_time", 1.0))
+        # requests no car could take, in arrival order; drained when riders leave a car
+        self.pending_requests = deque()
+        self.max_pending = max_pending
+        self.pending_high_water = 0
+        self.admissions = {status: 0 for status in Admission}
+        self.admission_lock = Lock()
+        self.on_assign = None   # called with the car when a queued request is assigned
+        self.telemetry = telemetry
         self.elevators = []
+        self.threads = []
         for i in range(num_elevators):
-            elevator = Elevator(i + 1, capacity)
+            elevator = Elevator(i + 1, capacity, scheduler_factory(), clock=clock, telemetry=telemetry,
+                                **car_options)
+            elevator.on_dropoff = self.drain_pending
             self.elevators.append(elevator)
-            Thread(target=elevator.run).start()
+            if start_threads:
+                # daemon threads: a forgotten stop() does not keep the process alive
+                thread = Thread(target=elevator.run, name=f"elevator-{elevator.id}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
 
-    def request_elevator(self, source_floor: int, destination_floor: int):
-        optimal_elevator = self.find_optimal_elevator(source_floor, destination_floor)
-        optimal_elevator.add_request(Request(source_floor, destination_floor))
+    def request_elevator(self, source_floor: int, destination_floor: int) -> AdmissionResult:
+        request = Request(source_floor, destination_floor)
+        request.request_time = self.clock()
+        with self.admission_lock:
+            return self._admit(request, None)
 
-    def find_optimal_elevator(self, source_floor: int, destination_floor: int) -> Elevator:
-        optimal_elevator = None
-        min_distance = float('inf')
+    def request_elevators(self, trips):
+        # destination dispatch: riders with the same source and destination
+        # floors are ranked once and assigned together, as one group
+        groups = {}
+        for source_floor, destination_floor in trips:
+            groups.setdefault((source_floor, destination_floor), []).append(Request(source_floor, destination_floor))
+        results = []
+        with self.admission_lock:
+            for (source_floor, destination_floor), requests in groups.items():
+                ranking = self.rank_elevators(source_floor, destination_floor)
+                now = self.clock()
+                for request in requests:
+                    request.request_time = now
+                    results.append(self._admit(request, ranking))
+        return results
+
+    def _admit(self, request, ranking):
+        # callers hold admission_lock; queued requests keep their place in line
+        if not self.pending_requests:
+            if ranking is None:
+                ranking = self.rank_elevators(request.source_floor, request.destination_floor)
+            for rank, elevator in enumerate(ranking):
+                if elevator.add_request(request):
+                    status = Admission.ACCEPTED if rank == 0 else Admission.REROUTED
+                    self.admissions[status] += 1
+                    return AdmissionResult(status, elevator, request)
+        if self.max_pending is not None and len(self.pending_requests) >= self.max_pending:
+            self.admissions[Admission.REJECTED] += 1
+            return AdmissionResult(Admission.REJECTED, None, request)
+        self.pending_requests.append(request)
+        self.pending_high_water = max(self.pending_high_water, len(self.pending_requests))
+        self.admissions[Admission.QUEUED] += 1
+        if self.telemetry is not None:
+            self.telemetry.sample("pending_depth", self.clock(), len(self.pending_requests))
+        return AdmissionResult(Admission.QUEUED, None, request)
 
+    def drain_pending(self, elevator=None):
+        # hand queued requests, oldest first, to cars that have room again
+        assigned = []
+        with self.admission_lock:
+            while self.pending_requests:
+                request = self.pending_requests[0]
+                ranking = self.rank_elevators(request.source_floor, request.destination_floor)
+                car = next((car for car in ranking if car.add_request(request)), None)
+                if car is None:
+                    break
+                self.pending_requests.popleft()
+                assigned.append((car, request))
+            if assigned and self.telemetry is not None:
+                self.telemetry.sample("pending_depth", self.clock(), len(self.pending_requests))
+        if self.on_assign is not None:
+            for car, _ in assigned:
+                self.on_assign(car)
+        return assigned
+
+    def queue_depths(self):
+        depths = [elevator.pending() for elevator in self.elevators]
+        return {"pending": len(self.pending_requests), "pending_high_water": self.pending_high_water,
+                "cars": depths, "car_mean": sum(depths) / len(depths), "car_max": max(depths),
+                "capacity": sum(elevator.capacity for elevator in self.elevators),
+                "admissions": {status.name: count for status, count in self.admissions.items()}}
+
+    def wait_until_idle(self, poll: float = 0.1):
+        while self.pending_requests or any(elevator.pending() for elevator in self.elevators):
+            time.sleep(poll)
+
+    def stop(self):
         for elevator in self.elevators:
-            distance = abs(source_floor - elevator.current_floor)
-            if distance < min_distance:
-                min_distance = distance
-                optimal_elevator = elevator
+            elevator.stop()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
 
-        return optimal_elevator
+    def set_dispatch(self, dispatch: DispatchStrategy):
+        self.dispatch = dispatch
+
+    def rank_elevators(self, source_floor: int, destination_floor: int):
+        states = [elevator.snapshot() for elevator in self.elevators]
+        return [self.elevators[i] for i in self.dispatch.rank(states, source_floor, destination_floor)]
+
+    def find_optimal_elevator(self, source_floor: int, destination_floor: int) -> Elevator:
+        return self.rank_elevators(source_floor, destination_floor)[0]
     
 class ElevatorSystem:
   @staticmethod
@@ -95,6 +502,8 @@ class ElevatorSystem:
     controller.request_elevator(1, 7)
     controller.request_elevator(2, 5)
     controller.request_elevator(1, 9)
+    controller.wait_until_idle()
+    controller.stop()
 
 if __name__ == "__main__":
     ElevatorSystem.run()
\ No newline at end of file
@@ -0,0 +1,139 @@
+# Async runtime -> every car is a coroutine instead of a thread
+#
+# Buildings are ordinary ElevatorControllers created with start_threads=False.
+# request() admits the request through the controller (dispatch, rerouting
+# and its pending queue) and wakes the chosen car through the car's
+# asyncio.Queue; so does a queued request that is handed to a car later. A car
+# coroutine blocks on its queue while idle; while busy it makes one
+# Elevator.step() after another and sleeps floor_time or door_time in between.
+# Everything runs on one thread, so the car locks are never contended. One
+# event loop runs thousands of cars: each costs an Elevator, a Queue and a
+# Task, with no thread stack.
+#
+# start() creates the car tasks; stop() stops taking requests, lets the cars
+# serve everything already admitted or queued and waits for the tasks to end
+# (stop(drain=False) cancels them).
+#
+#   python runtime.py --buildings 100 --elevators 20 --floors 40 --seconds 10
+import argparse
+import asyncio
+import random
+import time
+
+from design import ElevatorController, Admission, MOVE
+
+WAKE = "wake"    # queue tokens
+SHUTDOWN = "shutdown"
+
+class AsyncElevatorRuntime:
+    def __init__(self):
+        self.buildings = []
+        self.queues = {}   # elevator -> asyncio.Queue
+        self.tasks = []
+        self.accepting = False
+        self.delivered = 0
+        self.waits = []
+
+    def add_building(self, num_elevators, capacity, **options):
+        controller = ElevatorController(num_elevators, capacity, start_threads=False, verbose=False, **options)
+        controller.on_assign = self.wake
+        self.buildings.append(controller)
+        return len(self.buildings) - 1
+
+    async def start(self):
+        self.accepting = True
+        for controller in self.buildings:
+            for elevator in controller.elevators:
+                queue = asyncio.Queue()
+                self.queues[elevator] = queue
+                self.tasks.append(asyncio.create_task(self.run_car(elevator, queue)))
+
+    async def stop(self, drain=True):
+        self.accepting = False
+        if drain:
+            # queued requests may still be handed to any car, so keep every car
+            # running until the buildings' pending queues are empty
+            while any(controller.pending_requests for controller in self.buildings):
+                await asyncio.sleep(0.05)
+            for queue in self.queues.values():
+                queue.put_nowait(SHUTDOWN)
+        else:
+            for task in self.tasks:
+                task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.queues = {}
+
+    def request(self, building, source_floor, destination_floor):
+        if not self.accepting:
+            raise RuntimeError("runtime is not running")
+        result = self.buildings[building].request_elevator(source_floor, destination_floor)
+        if result.elevator is not None:
+            self.wake(result.elevator)
+        return result
+
+    def wake(self, elevator):
+        self.queues[elevator].put_nowait(WAKE)
+
+    async def run_car(self, elevator, queue):
+        stopping = False
+        while True:
+            if not elevator.pending():
+                if stopping:
+                    return
+                token = await queue.get()   # idle: sleep until there is work
+                stopping = stopping or token == SHUTDOWN
+                continue
+            while not queue.empty():
+                stopping = stopping or queue.get_nowait() == SHUTDOWN
+            step = elevator.step()
+            if step is None:
+                continue
+            if step.kind == MOVE:
+                await asyncio.sleep(elevator.floor_time)
+                continue
+            for request in step.picked:
+                self.waits.append(request.pickup_time - request.request_time)
+            self.delivered += len(step.dropped)
+            await asyncio.sleep(elevator.door_time)
+
+async def main(args):
+    runtime = AsyncElevatorRuntime()
+    for _ in range(args.buildings):
+        runtime.add_building(args.elevators, args.capacity,
+                             floor_time=args.floor_time, door_time=args.door_time)
+    await runtime.start()
+    rng = random.Random(args.seed)
+    requests = 0
+    start = time.perf_counter()
+    deadline = start + args.seconds
+    interval = 1.0 / args.rate
+    while time.perf_counter() < deadline:
+        for _ in range(max(1, int(args.rate * 0.01))):
+            source, destination = rng.sample(range(1, args.floors + 1), 2)
+            runtime.request(rng.randrange(args.buildings), source, destination)
+            requests += 1
+        await asyncio.sleep(max(interval, 0.01))
+    await runtime.stop()
+    elapsed = time.perf_counter() - start
+    cars = args.buildings * args.elevators
+    waits = sorted(runtime.waits)
+    p95 = waits[int(0.95 * len(waits))] if waits else 0.0
+    print(f"cars          {cars} in {args.buildings} buildings")
+    print(f"requests      {requests}, delivered {runtime.delivered} in {elapsed:.2f}s")
+    queued = sum(b.admissions[Admission.QUEUED] for b in runtime.buildings)
+    print(f"queued        {queued} (every car full), still pending {sum(len(b.pending_requests) for b in runtime.buildings)}")
+    print(f"wait          mean {sum(waits) / max(1, len(waits)):.2f}s, p95 {p95:.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="asyncio elevator runtime: one coroutine per car")
+    parser.add_argument("--buildings", type=int, default=100)
+    parser.add_argument("--elevators", type=int, default=20, help="cars per building")
+    parser.add_argument("--capacity", type=int, default=20)
+    parser.add_argument("--floors", type=int, default=40)
+    parser.add_argument("--rate", type=float, default=2000.0, help="requests per second over all buildings")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--floor-time", type=float, default=0.05)
+    parser.add_argument("--door-time", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
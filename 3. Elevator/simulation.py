@@ -0,0 +1,168 @@
+# Simulation -> replay elevator traffic on a simulated clock
+#
+# Same Elevator, ElevatorController and Request as the threaded system, but no
+# threads and no sleeping: cars are created with start_threads=False and a
+# heap of timed events drives them.
+#   ARRIVAL  a rider calls a car; the controller admits it as usual (a car,
+#            or the controller's pending queue when every car is full)
+#   STEP     one Elevator.step() of a car; the next STEP is due after
+#            floor_time (moved one floor) or door_time (served a stop)
+# A car with nothing to do has no STEP in the heap until a request wakes it.
+# Arrivals are read lazily from any iterable of (time, source, destination)
+# in time order, so long traces are never held in memory.
+#
+#   python simulation.py --hours 24 --rate 2000 --elevators 4 --floors 30
+import argparse
+import heapq
+import itertools
+import json
+import random
+import time
+
+from telemetry import Telemetry
+from design import ElevatorController, LookScheduler, FifoScheduler, NearestCarDispatch, CostDispatch, MOVE
+
+ARRIVAL = 0
+STEP = 1
+SCHEDULERS = {"look": LookScheduler, "fifo": FifoScheduler}
+DISPATCHERS = {"cost": CostDispatch, "nearest": NearestCarDispatch}
+
+def random_traffic(floors, requests_per_hour, hours, lobby_share=0.5, seed=0):
+    # Poisson arrivals; lobby_share of the trips start or end at floor 1
+    rng = random.Random(seed)
+    now, end = 0.0, hours * 3600.0
+    while True:
+        now += rng.expovariate(requests_per_hour / 3600.0)
+        if now >= end:
+            return
+        if rng.random() < lobby_share:
+            floor = rng.randint(2, floors)
+            yield (now, 1, floor) if rng.random() < 0.5 else (now, floor, 1)
+        else:
+            source, destination = rng.sample(range(1, floors + 1), 2)
+            yield now, source, destination
+
+def summarize(values):
+    values = sorted(values)
+    count = len(values)
+    if not count:
+        return {"count": 0}
+    def pct(p):
+        return values[min(count - 1, int(p / 100.0 * count))]
+    return {"count": count, "mean": sum(values) / count, "p50": pct(50), "p95": pct(95),
+            "p99": pct(99), "max": values[-1]}
+
+class Simulation:
+    def __init__(self, num_elevators, capacity, scheduler_factory=LookScheduler,
+                 floor_time=1.0, door_time=1.0, dispatch=None, max_pending=None, telemetry=None,
+                 keep_samples=True):
+        self.now = 0.0
+        self.controller = ElevatorController(num_elevators, capacity, scheduler_factory,
+                                             start_threads=False, clock=self.clock, dispatch=dispatch,
+                                             max_pending=max_pending, telemetry=telemetry, floor_time=floor_time,
+                                             door_time=door_time, verbose=False)
+        self.controller.on_assign = self.wake   # queued requests handed to a car later
+        self.events = []
+        self.sequence = itertools.count()  # keeps events at the same time in insertion order
+        self.stepping = set()              # ids of cars with a STEP in the heap
+        self.requests = 0
+        self.delivered = 0
+        self.keep_samples = keep_samples   # False: constant memory, use telemetry for percentiles
+        self.waits = []
+        self.rides = []
+        self.first_arrival = None
+        self.last_dropoff = 0.0
+        self.event_count = 0
+
+    def clock(self):
+        return self.now
+
+    def schedule(self, at, kind, payload):
+        heapq.heappush(self.events, (at, next(self.sequence), kind, payload))
+
+    def run(self, arrivals):
+        arrivals = iter(arrivals)
+        self.schedule_arrival(arrivals)
+        start = time.perf_counter()
+        while self.events:
+            at, _, kind, payload = heapq.heappop(self.events)
+            self.now = at
+            self.event_count += 1
+            if kind == ARRIVAL:
+                self.arrive(*payload)
+                self.schedule_arrival(arrivals)
+            else:
+                self.advance(payload)
+        return self.stats(time.perf_counter() - start)
+
+    def schedule_arrival(self, arrivals):
+        for at, source, destination in arrivals:
+            self.schedule(at, ARRIVAL, (source, destination))
+            return
+
+    def arrive(self, source, destination):
+        self.requests += 1
+        if self.first_arrival is None:
+            self.first_arrival = self.now
+        result = self.controller.request_elevator(source, destination)
+        if result.elevator is not None:
+            self.wake(result.elevator)
+
+    def wake(self, elevator):
+        if elevator.id not in self.stepping:
+            self.stepping.add(elevator.id)
+            self.schedule(self.now, STEP, elevator)
+
+    def advance(self, elevator):
+        step = elevator.step()
+        if step is None:
+            self.stepping.discard(elevator.id)
+            return
+        if step.kind == MOVE:
+            self.schedule(self.now + elevator.floor_time, STEP, elevator)
+            return
+        if self.keep_samples:
+            for request in step.picked:
+                self.waits.append(request.pickup_time - request.request_time)
+            for request in step.dropped:
+                self.rides.append(request.dropoff_time - request.pickup_time)
+        if step.dropped:
+            self.delivered += len(step.dropped)
+            self.last_dropoff = self.now
+        self.schedule(self.now + elevator.door_time, STEP, elevator)
+
+    def stats(self, wall_seconds):
+        return {"requests": self.requests, "delivered": self.delivered,
+                "lost": self.requests - self.delivered,
+                "wait_sec": summarize(self.waits), "ride_sec": summarize(self.rides),
+                "floors_moved": sum(elevator.floors_moved for elevator in self.controller.elevators),
+                "queues": self.controller.queue_depths(),
+                "simulated_hours": self.last_dropoff / 3600.0,
+                "busy_hours": (self.last_dropoff - (self.first_arrival or 0.0)) / 3600.0,
+                "events": self.event_count, "wall_sec": wall_seconds,
+                "events_per_sec": self.event_count / wall_seconds if wall_seconds else 0.0}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="discrete-event elevator simulation")
+    parser.add_argument("--elevators", type=int, default=4)
+    parser.add_argument("--capacity", type=int, default=20, help="pending requests per car")
+    parser.add_argument("--max-pending", type=int, default=None, help="bound on the controller's pending queue")
+    parser.add_argument("--floors", type=int, default=30)
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--rate", type=float, default=1500.0, help="requests per hour")
+    parser.add_argument("--scheduler", choices=sorted(SCHEDULERS), default="look")
+    parser.add_argument("--dispatch", choices=sorted(DISPATCHERS), default="cost")
+    parser.add_argument("--floor-time", type=float, default=1.0)
+    parser.add_argument("--door-time", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--telemetry", help="write histograms and queue-depth samples to this JSON file")
+    args = parser.parse_args()
+    telemetry = Telemetry() if args.telemetry else None
+    dispatch = (CostDispatch(args.floor_time, args.door_time) if args.dispatch == "cost"
+                else NearestCarDispatch())
+    simulation = Simulation(args.elevators, args.capacity, SCHEDULERS[args.scheduler],
+                            args.floor_time, args.door_time, dispatch, args.max_pending, telemetry)
+    result = simulation.run(random_traffic(args.floors, args.rate, args.hours, seed=args.seed))
+    if telemetry:
+        telemetry.to_json(args.telemetry)
+    print(json.dumps(result, indent=2))
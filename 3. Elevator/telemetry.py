@@ -0,0 +1,208 @@
+# Telemetry -> low-overhead measurements for the elevator system
+#
+# LogHistogram   HDR-style histogram: values below 2**precision are counted
+#                exactly, larger ones in log-linear buckets with a relative
+#                error under 2**(1 - precision). One preallocated array of
+#                counters, so recording is an index calculation and an add.
+# RingBuffer     the last N (time, value) samples in preallocated arrays.
+# Telemetry      named histograms and sample rings. Every thread records into
+#                its own shard, so recording takes no lock; snapshot() merges
+#                the shards.
+# TimedLock      a Lock (usable under Condition) that records how long threads
+#                waited for it and how long it was held.
+#
+# Times are recorded in microseconds (lock times in nanoseconds).
+import json
+import time
+from array import array
+from threading import Lock, local, get_ident
+
+class LogHistogram:
+    def __init__(self, precision=7, max_bits=48):
+        self.precision = precision
+        self.half = 1 << (precision - 1)
+        self.exact = 1 << precision
+        self.max_value = (1 << max_bits) - 1
+        self.counts = array("Q", bytes(8 * (self.exact + (max_bits - precision) * self.half)))
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    def index(self, value):
+        if value < self.exact:
+            return value
+        shift = value.bit_length() - self.precision
+        return self.exact + (shift - 1) * self.half + (value >> shift) - self.half
+
+    def lower_bound(self, index):
+        if index < self.exact:
+            return index
+        shift, offset = divmod(index - self.exact, self.half)
+        return (offset + self.half) << (shift + 1)
+
+    def record(self, value):
+        value = min(max(int(value), 0), self.max_value)
+        self.counts[self.index(value)] += 1
+        self.total += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        counts = self.counts
+        for i, count in enumerate(other.counts):
+            if count:
+                counts[i] += count
+        self.total += other.total
+        self.sum += other.sum
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        if not self.total:
+            return 0
+        rank = max(1, int(p / 100.0 * self.total + 0.5))
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.lower_bound(i), self.max)
+        return self.max
+
+    def summary(self):
+        if not self.total:
+            return {"count": 0}
+        return {"count": self.total, "mean": self.sum / self.total, "min": self.min, "max": self.max,
+                "p50": self.percentile(50), "p90": self.percentile(90), "p95": self.percentile(95),
+                "p99": self.percentile(99),
+                "p999": self.percentile(99.9)}
+
+class RingBuffer:
+    def __init__(self, size):
+        self.size = size
+        self.times = array("d", bytes(8 * size))
+        self.values = array("d", bytes(8 * size))
+        self.next = 0
+        self.count = 0
+
+    def append(self, at, value):
+        i = self.next
+        self.times[i] = at
+        self.values[i] = value
+        self.next = (i + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def samples(self):
+        # oldest first
+        start = (self.next - self.count) % self.size
+        return [(self.times[(start + i) % self.size], self.values[(start + i) % self.size])
+                for i in range(self.count)]
+
+class Telemetry:
+    HISTOGRAMS = ("wait_us", "ride_us", "trip_floors", "car_depth", "pending_depth",
+                  "lock_wait_ns", "lock_hold_ns")
+    SERIES = ("pending_depth",)
+
+    def __init__(self, ring_size=4096, time_locks=True):
+        self.ring_size = ring_size
+        self.time_locks = time_locks   # cars use a TimedLock only when this is set
+        self.local = local()
+        self.shards = []
+        self.shards_lock = Lock()   # taken once per thread, when its shard is created
+
+    def shard(self):
+        shard = getattr(self.local, "shard", None)
+        if shard is None:
+            shard = ({name: LogHistogram() for name in self.HISTOGRAMS},
+                     {name: RingBuffer(self.ring_size) for name in self.SERIES})
+            self.local.shard = shard
+            with self.shards_lock:
+                self.shards.append(shard)
+        return shard
+
+    def record(self, name, value):
+        self.shard()[0][name].record(value)
+
+    def sample(self, name, at, value):
+        histograms, series = self.shard()
+        histograms[name].record(value)
+        series[name].append(at, value)
+
+    # elevator events
+    def record_pickups(self, requests):
+        histogram = self.shard()[0]["wait_us"]
+        for request in requests:
+            histogram.record((request.pickup_time - request.request_time) * 1e6)
+
+    def record_dropoffs(self, requests):
+        histograms = self.shard()[0]
+        for request in requests:
+            histograms["ride_us"].record((request.dropoff_time - request.pickup_time) * 1e6)
+            histograms["trip_floors"].record(abs(request.destination_floor - request.source_floor))
+
+    def snapshot(self):
+        with self.shards_lock:
+            shards = list(self.shards)
+        merged = {name: LogHistogram() for name in self.HISTOGRAMS}
+        series = {name: [] for name in self.SERIES}
+        for histograms, rings in shards:
+            for name, histogram in histograms.items():
+                merged[name].merge(histogram)
+            for name, ring in rings.items():
+                series[name].extend(ring.samples())
+        for samples in series.values():
+            samples.sort()
+            del samples[:-self.ring_size]
+        return {"histograms": {name: histogram.summary() for name, histogram in merged.items()},
+                "series": series, "threads": len(shards)}
+
+    def to_json(self, path=None):
+        text = json.dumps(self.snapshot(), indent=2)
+        if path:
+            with open(path, "w") as f:
+                f.write(text + "\n")
+        return text
+
+class TimedLock:
+    # both samples are recorded after release, outside the critical section
+    def __init__(self, telemetry):
+        self.lock = Lock()
+        self.telemetry = telemetry
+        self.owner = None
+        self.acquired_at = 0
+        self.waited = 0
+
+    def acquire(self, blocking=True, timeout=-1):
+        start = time.perf_counter_ns()
+        if not self.lock.acquire(blocking, timeout):
+            return False
+        now = time.perf_counter_ns()
+        self.owner = get_ident()
+        self.acquired_at = now
+        self.waited = now - start
+        return True
+
+    def release(self):
+        held = time.perf_counter_ns() - self.acquired_at
+        waited = self.waited
+        self.owner = None
+        self.lock.release()
+        self.telemetry.record("lock_wait_ns", waited)
+        self.telemetry.record("lock_hold_ns", held)
+
+    def _is_owned(self):
+        # used by Condition
+        return self.owner == get_ident()
+
+    def locked(self):
+        return self.lock.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc):
+        self.release()